@@ -2,7 +2,7 @@ import streamlit as st
 import requests
 import re
 import app as app
-from app import get_remedy, QueryRequest
+from app import stream_remedy
 
 
 #API_URL = "http://localhost:8000/get_remedy"
@@ -14,10 +14,6 @@ st.title("🪷 Ayurveda Remedy Recommender")
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
-def stream_generator():
-    for word in data["recommendation"].split():
-        yield word + " "
-
 # Display chat history
 for msg in st.session_state.messages:
     if msg["role"] == "user":
@@ -25,6 +21,11 @@ for msg in st.session_state.messages:
     else:
         st.markdown(f"**🤖 Bot:** {msg['content']}")
 
+# Prakriti from the quiz page, if taken; the search is limited to its doshas
+prakriti = st.session_state.get("prakriti_result")
+if prakriti:
+    st.caption(f"Matching conditions for your prakriti: {prakriti}")
+
 # User input
 user_input = st.text_input("Enter your symptoms:", key="user_input")
 
@@ -32,30 +33,10 @@ if st.button("Get Remedy"):
     if user_input:
         st.session_state.messages.append({"role": "user", "content": user_input})
 
-        with st.spinner("Finding remedy..."):
-            #res = requests.post(API_URL, json={"query": user_input})
-            res = get_remedy(QueryRequest(query=user_input))
-
-        #if res.status_code == 200:
-        data = res
-        if "recommendation" in data:
-            #formatted_output = format_llm_response(data["recommendation"])
-            st.write_stream(stream_generator())                
-            #bot_reply = formatted_output            
-                
-        elif "matches" in data:
-            matches = data["matches"]
-            if matches:
-                bot_reply = "Here are the top matches for your symptoms:\n\n"
-                for match in matches:
-                    bot_reply += f"- **Disease:** {match['disease']}\n"
-                    bot_reply += f"  **Dosha:** {match['dosha']}\n"
-                    bot_reply += f"  **Remedies:** {match['remedy']}\n\n"
-            else:
-                bot_reply = "No matching remedies found for your symptoms."
-        else:
-            bot_reply = "No remedy found for given symptoms."
-
-        st.session_state.messages.append({"role": "bot", "content": data["recommendation"]}) 
+        #res = requests.post(API_URL, json={"query": user_input})
+        # Render completion tokens as the LLM produces them
+        recommendation = st.write_stream(stream_remedy(user_input, prakriti))
+
+        st.session_state.messages.append({"role": "bot", "content": recommendation}) 
 
     st.rerun()
@@ -1,53 +1,361 @@
 __import__('pysqlite3')
 import sys
 sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
-from fastapi import FastAPI
-from pydantic import BaseModel
-from fastapi.middleware.cors import CORSMiddleware
-import spacy
-from sentence_transformers import SentenceTransformer
-import chromadb
-from transformers import pipeline
+import time
+_import_started = time.perf_counter()
 import json
-from huggingface_hub import InferenceClient
-from openai import OpenAI
-import streamlit as st
-import mysql.connector
-from mysql.connector import Error
-
-# Load key from streamlit secrets
-openai_api_key = st.secrets["openAI_key"]
-OpenAIClient = OpenAI(api_key=openai_api_key)  # Replace with your OpenAI API key
-dbhost = st.secrets["host"]
-dbport = st.secrets["port"]
-dbuser = st.secrets["user"]
-dbpassword = st.secrets["password"]
-dbdatabase = st.secrets["database"]
+import os
+import sqlite3
+import hashlib
+import logging
+import queue
+import atexit
+import asyncio
+import threading
+import tomllib
+from contextlib import asynccontextmanager, contextmanager
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import metrics
+import prompt_builder
+import retrieval
+from singleflight import AsyncSingleFlight, SingleFlight
+
+# Seconds spent per import/load stage, in the order they happened. Stages
+# can nest (the import stages run inside the app module import)
+startup_timings = OrderedDict()
+
+@contextmanager
+def timed(stage):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_timings[stage] = startup_timings.get(stage, 0.0) + time.perf_counter() - started
+
+def startup_report():
+    return {
+        "stages": {stage: round(seconds, 4) for stage, seconds in startup_timings.items()},
+        "loaded": sorted(_resources)
+    }
+
+with timed("import fastapi"):
+    from fastapi import FastAPI
+    from pydantic import BaseModel
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+# Secret name (as in .streamlit/secrets.toml) -> environment variable overriding it
+SETTINGS_ENV = {
+    "openAI_key": "AYURAI_OPENAI_API_KEY",
+    "host": "AYURAI_DB_HOST",
+    "port": "AYURAI_DB_PORT",
+    "user": "AYURAI_DB_USER",
+    "password": "AYURAI_DB_PASSWORD",
+    "database": "AYURAI_DB_NAME",
+}
+
+def load_settings():
+    """
+    Reads the OpenAI key and DB credentials without needing Streamlit.
+    Environment variables win over the TOML config file (AYURAI_CONFIG_FILE,
+    default .streamlit/secrets.toml, same keys as st.secrets). Inside a
+    Streamlit page, st.secrets fills in whatever is still missing.
+    """
+    settings = {}
+    path = os.environ.get("AYURAI_CONFIG_FILE", ".streamlit/secrets.toml")
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            settings.update(tomllib.load(f))
+    if "streamlit" in sys.modules:
+        secrets = sys.modules["streamlit"].secrets
+        for key in SETTINGS_ENV:
+            try:
+                if key not in settings and key in secrets:
+                    settings[key] = secrets[key]
+            except Exception:
+                break  # no secrets configured
+    for key, env in SETTINGS_ENV.items():
+        if env in os.environ:
+            settings[key] = os.environ[env]
+    return settings
+
+settings = load_settings()
+# When no key is configured the OpenAI client falls back to OPENAI_API_KEY
+openai_api_key = settings.get("openAI_key")
+dbhost = settings.get("host")
+dbport = int(settings.get("port", 3306))
+dbuser = settings.get("user")
+dbpassword = settings.get("password")
+dbdatabase = settings.get("database")
+# Defer model loads and heavy imports (spaCy, torch, Chroma, OpenAI) until
+# first use or an explicit warmup() instead of paying for them at import
+LAZY_STARTUP = os.environ.get("AYURAI_LAZY_STARTUP", "0") == "1"
+DB_POOL_SIZE = int(os.environ.get("AYURAI_DB_POOL_SIZE", 2))
+INTERACTION_QUEUE_SIZE = int(os.environ.get("AYURAI_LOG_QUEUE_SIZE", 10000))
+INTERACTION_BATCH_SIZE = int(os.environ.get("AYURAI_LOG_BATCH_SIZE", 100))
+INTERACTION_FLUSH_INTERVAL = float(os.environ.get("AYURAI_LOG_FLUSH_INTERVAL", 1.0))
+RETRIEVAL_BACKEND = os.environ.get("AYURAI_RETRIEVAL_BACKEND", "chroma")  # "chroma", "numpy" or "mmap"
+INDEX_ARTIFACT = os.environ.get("AYURAI_INDEX_ARTIFACT", "./index_artifacts/symptom_index")
+# Disease names, doshas and remedies by disease ID, written by populate_chromadb.py
+DISEASE_STORE = os.environ.get("AYURAI_DISEASE_STORE", "./index_artifacts/disease_store.json")
+RESPONSE_CACHE_SIZE = int(os.environ.get("AYURAI_CACHE_SIZE", 1024))
+RESPONSE_CACHE_TTL = float(os.environ.get("AYURAI_CACHE_TTL", 24 * 3600))
+RESPONSE_CACHE_PATH = os.environ.get("AYURAI_CACHE_PATH")  # e.g. response_cache.db; unset keeps it in memory only
+EMBEDDER_BACKEND = os.environ.get("AYURAI_EMBEDDER_BACKEND", "torch")  # "torch" or "onnx" (int8, see onnx_embedder.py)
+ONNX_MODEL_DIR = os.environ.get("AYURAI_ONNX_MODEL_DIR", "./onnx_embedder")
+# Look queries up in the dataset's symptom phrases first, NER only when none match
+SYMPTOM_MATCHER = os.environ.get("AYURAI_SYMPTOM_MATCHER", "1") == "1"
+SYMPTOM_DATA = os.environ.get("AYURAI_SYMPTOM_DATA", "cleaned_ayurveda_data.json")
+# Top-match similarity (1 - squared L2 distance, so 2*cosine - 1 for these
+# normalized vectors) at or above which the answer is rendered from the
+# match metadata instead of asking the LLM; unset always asks the LLM
+LLM_BYPASS_SIMILARITY = os.environ.get("AYURAI_LLM_BYPASS_SIMILARITY")
+LLM_BYPASS_SIMILARITY = float(LLM_BYPASS_SIMILARITY) if LLM_BYPASS_SIMILARITY else None
+# "joined" embeds the extracted symptoms as one text; "per_symptom" embeds
+# and searches each one and fuses the hits per disease (see retrieval.py)
+RETRIEVAL_MODE = os.environ.get("AYURAI_RETRIEVAL_MODE", "joined")
+RETRIEVAL_FUSION = os.environ.get("AYURAI_RETRIEVAL_FUSION", "rrf")  # "rrf" or "sum"
+# Collapse the joined mode's hits to distinct diseases (from an over-fetch),
+# so the matches are not the same disease several times over
+DISEASE_AGGREGATION = os.environ.get("AYURAI_DISEASE_AGGREGATION", "1") == "1"
+# Input tokens (system + user message) the prompt builder may use per LLM call
+PROMPT_TOKEN_BUDGET = int(os.environ.get("AYURAI_PROMPT_TOKEN_BUDGET", 1500))
+# DEBUG also logs every match with its full remedy set
+LOG_LEVEL = os.environ.get("AYURAI_LOG_LEVEL", "INFO").upper()
+
+logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger("ayurai")
+logger.setLevel(LOG_LEVEL)
+
+# Exported at /metrics. Every worker process keeps its own, so scrape each
+# worker (or sum across them) when running several
+metrics_registry = metrics.Registry()
+stage_seconds = metrics_registry.register(metrics.Histogram(
+    "ayurai_stage_seconds", "Seconds spent per request pipeline stage.", ["stage"]))
+errors_total = metrics_registry.register(metrics.Counter(
+    "ayurai_errors_total", "Exceptions raised per request pipeline stage.", ["stage"]))
+no_symptom_responses = metrics_registry.register(metrics.Counter(
+    "ayurai_no_symptom_responses_total", "Queries answered with the no-symptoms message."))
+cache_lookups = metrics_registry.register(metrics.Counter(
+    "ayurai_cache_lookups_total", "Response cache lookups by result.", ["result"]))
+prompt_tokens = metrics_registry.register(metrics.Histogram(
+    "ayurai_prompt_tokens", "Input tokens per LLM prompt, as counted by the prompt builder.",
+    buckets=(100, 200, 300, 400, 600, 800, 1000, 1500, 2000, 3000, 4000)))
+llm_tokens = metrics_registry.register(metrics.Counter(
+    "ayurai_llm_tokens_total", "Tokens billed by the LLM API, by kind (prompt or completion).", ["kind"]))
+singleflight_total = metrics_registry.register(metrics.Counter(
+    "ayurai_singleflight_total",
+    "Coalesced computations by flight and role; a follower reused a leader's in-flight result.",
+    ["flight", "role"]))
+answers_total = metrics_registry.register(metrics.Counter(
+    "ayurai_answers_total", "Recommendations by where they came from (llm, template or cache).", ["source"]))
+
+@contextmanager
+def stage_timer(stage):
+    """Times one pipeline stage into `stage_seconds` and counts the exceptions it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        errors_total.inc(stage=stage)
+        raise
+    finally:
+        stage_seconds.observe(time.perf_counter() - started, stage=stage)
 
 # Load models
-@st.cache_resource
 def load_symptoms_model():
-    return spacy.load("symptom_ner_model")
+    with timed("import spacy"):
+        import spacy
+    with timed("load symptom_ner_model"):
+        return spacy.load("symptom_ner_model")
 
-@st.cache_resource
 def load_embedder_model():
-    return SentenceTransformer("all-MiniLM-L6-v2")
+    if EMBEDDER_BACKEND == "onnx":
+        with timed("import onnx_embedder"):
+            from onnx_embedder import OnnxEmbedder
+        with timed("load all-MiniLM-L6-v2 (onnx int8)"):
+            return OnnxEmbedder(ONNX_MODEL_DIR)
+    with timed("import sentence_transformers"):
+        from sentence_transformers import SentenceTransformer
+    with timed("load all-MiniLM-L6-v2"):
+        return SentenceTransformer("all-MiniLM-L6-v2")
 
-@st.cache_resource  # if using Streamlit
-def get_chroma_client():
-    return chromadb.PersistentClient(path="./chromadb_store")
+def load_symptom_matcher():
+    with timed("import symptom_matcher"):
+        from symptom_matcher import SymptomMatcher
+    with timed("build symptom matcher"):
+        return SymptomMatcher.from_dataset(SYMPTOM_DATA)
 
+def load_chroma_client():
+    with timed("import chromadb"):
+        import chromadb
+    with timed("open chromadb_store"):
+        return chromadb.PersistentClient(path="./chromadb_store")
 
-# Load models
-nlp = load_symptoms_model()
-embedder = load_embedder_model()
+def load_search_index():
+    """
+    Returns the object `query` is called on: the Chroma collection itself, an
+    exact NumPy index over its vectors, or the NumPy index memory mapped from
+    the artifact populate_chromadb.py writes, which skips Chroma entirely.
+    """
+    with timed("import vector_index"):
+        from vector_index import NumpyIndex
+    if RETRIEVAL_BACKEND == "mmap":
+        with timed("open index artifact"):
+            return NumpyIndex.from_artifact(INDEX_ARTIFACT)
+    # ChromaDB client
+    collection = _resource("chroma", load_chroma_client).get_or_create_collection(name="ayurveda_symptoms")
+    if RETRIEVAL_BACKEND == "numpy":
+        with timed("build numpy index"):
+            return NumpyIndex.from_collection(collection)
+    return collection
+
+def load_disease_index():
+    """Sentence-to-disease map of the search index, for collapsing hits per disease."""
+    index = get_search_index()
+    with timed("build disease index"):
+        if hasattr(index, "metadatas"):
+            return retrieval.DiseaseIndex(index.ids, index.metadatas)
+        return retrieval.DiseaseIndex.from_collection(index)
+
+def load_disease_store():
+    from disease_store import DiseaseStore
+    if not os.path.exists(DISEASE_STORE):
+        # Vectors from before the store carry their disease details inline
+        logger.warning("No disease store at %s; using the vector metadata only", DISEASE_STORE)
+        return DiseaseStore({})
+    with timed("load disease store"):
+        return DiseaseStore.load(DISEASE_STORE)
+
+def load_openai_client():
+    with timed("import openai"):
+        from openai import OpenAI
+    return OpenAI(api_key=openai_api_key)  # Replace with your OpenAI API key
+
+def load_async_openai_client():
+    with timed("import openai"):
+        from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=openai_api_key)
+
+_resources = {}
+# One lock per resource, so a loader can itself load the resources it needs
+# (the search index needs the Chroma client) without deadlocking
+_resource_locks = {}
+_resource_locks_lock = threading.Lock()
+
+def _resource(name, loader):
+    resource = _resources.get(name)
+    if resource is None:
+        with _resource_locks_lock:
+            lock = _resource_locks.setdefault(name, threading.Lock())
+        with lock:
+            resource = _resources.get(name)
+            if resource is None:
+                resource = _resources[name] = loader()
+    return resource
+
+def get_nlp():
+    return _resource("nlp", load_symptoms_model)
+
+def get_symptom_matcher():
+    return _resource("symptom_matcher", load_symptom_matcher)
+
+def get_embedder():
+    return _resource("embedder", load_embedder_model)
+
+def get_search_index():
+    return _resource("search_index", load_search_index)
+
+def get_disease_index():
+    return _resource("disease_index", load_disease_index)
+
+def get_disease_store():
+    return _resource("disease_store", load_disease_store)
+
+def get_openai_client():
+    return _resource("openai", load_openai_client)
+
+def get_async_openai_client():
+    return _resource("async_openai", load_async_openai_client)
+
+_ready = threading.Event()
+
+def warmup():
+    """Loads every model and client now instead of on first use, then prints the timing report."""
+    get_nlp()
+    if SYMPTOM_MATCHER:
+        get_symptom_matcher()
+    get_embedder()
+    index = get_search_index()
+    if hasattr(index, "partition"):
+        # Pre-filtered partitions for single-dosha searches, built before
+        # a pre-loading server forks so workers share them
+        for dosha in retrieval.DOSHAS:
+            index.partition(retrieval.dosha_filter([dosha]))
+    get_disease_index()
+    get_disease_store()
+    get_openai_client()
+    get_async_openai_client()
+    _ready.set()
+    logger.info("Startup timings: %s", json.dumps(startup_report(), indent=2))
+
+def after_fork():
+    """
+    Called in each worker after a pre-loaded master forks (see server.py).
+    Model weights are inherited copy-on-write; SQLite handles are not safe
+    to share across processes, so Chroma and the cache DB are reopened.
+    """
+    if RETRIEVAL_BACKEND != "mmap":
+        if "chroma" in _resources:
+            # PersistentClient hands out the System cached for its path, which
+            # still holds the master's handles, until that cache is cleared
+            from chromadb.api.client import SharedSystemClient
+            SharedSystemClient.clear_system_cache()
+        _resources.pop("chroma", None)
+        if RETRIEVAL_BACKEND == "chroma":
+            _resources.pop("search_index", None)
+            get_search_index()
+    response_cache.reconnect()
+
+def __getattr__(name):
+    # Keeps `app.nlp`, `app.embedder` and `app.search_index` working now that they load lazily
+    getters = {"nlp": get_nlp, "embedder": get_embedder, "search_index": get_search_index}
+    if name in getters:
+        return getters[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Dedicated pool for CPU-bound NER/embedding work in the async endpoints, kept
+# small so it does not compete with torch/spaCy intra-op threads
+cpu_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("AYURAI_CPU_WORKERS", min(4, os.cpu_count() or 1))),
+    thread_name_prefix="ayurai-cpu"
+)
+
+# Set when the background warmup raised; /readyz then reports it
+_warmup_error = None
 
-# ChromaDB client
-client = get_chroma_client()
-collection = client.get_or_create_collection(name="ayurveda_symptoms")
+def _warmup_done(future):
+    global _warmup_error
+    if future.cancelled() or future.exception() is None:
+        return
+    _warmup_error = future.exception()
+    logger.error("Warmup failed; /readyz will answer 503", exc_info=_warmup_error)
+
+@asynccontextmanager
+async def lifespan(app):
+    if not _ready.is_set():
+        # Load in the background so /healthz answers while /readyz gates traffic
+        warmup_future = asyncio.get_running_loop().run_in_executor(None, warmup)
+        warmup_future.add_done_callback(_warmup_done)
+    yield
+    # Flush queued interaction records before the worker exits
+    interaction_log.close()
 
 # FastAPI app
-app = FastAPI(title="Ayurveda Remedy API")
+app = FastAPI(title="Ayurveda Remedy API", lifespan=lifespan)
 
 # Allow Streamlit to call API
 app.add_middleware(
@@ -74,180 +382,895 @@ def _as_string(obj):
                 return ", ".join(map(str, obj))
         return str(obj)
 
-def insert_interactions(user_query, extracted_symptoms, system_response, score, openAI_response):
+INTERACTIONS_SQL = """
+    INSERT INTO interactions
+        (user_query, extracted_symptoms, system_response, score, openAI_response)
+    VALUES
+        (%s, %s, %s, %s, %s)
+"""
+
+_db_pool = None
+_db_pool_lock = threading.Lock()
+
+def get_db_pool():
+    """Lazily creates the MySQL connection pool shared by the interaction log writer."""
+    global _db_pool
+    with _db_pool_lock:
+        if _db_pool is None:
+            with timed("import mysql.connector"):
+                from mysql.connector import pooling
+            _db_pool = pooling.MySQLConnectionPool(
+                pool_name="ayurai",
+                pool_size=DB_POOL_SIZE,
+                host=dbhost,
+                port=dbport,                # default MySQL port
+                user=dbuser,
+                password=dbpassword,
+                database=dbdatabase
+            )
+    return _db_pool
+
+def write_interactions(records):
     """
-    Inserts one or more interaction records into the MySQL `interactions` table.
-    
+    Inserts interaction records into the MySQL `interactions` table using a
+    pooled connection.
+
     :param records: List of tuples, each tuple matches the
                     (user_query, extracted_symptoms, system_response, score, openAI_response)
     """
-    records = [(_as_string(user_query), 
-                _as_string(extracted_symptoms), 
-                _as_string(system_response), 
-                float(score) if score is not None else 0.0, 
-                _as_string(openAI_response))]
-    try:
-        # 1. Establish a connection
-        conn = mysql.connector.connect(
-            host=dbhost,
-            port=dbport,                # default MySQL port
-            user=dbuser,
-            password=dbpassword,
-            database=dbdatabase
-        )
-        if not conn.is_connected():
-            raise Error("Failed to connect to database")
+    from mysql.connector import Error
 
+    conn = None
+    cursor = None
+    started = time.perf_counter()
+    try:
+        conn = get_db_pool().get_connection()
         cursor = conn.cursor()
-
-        # 2. Prepare the INSERT statement
-        sql = """
-            INSERT INTO interactions
-                (user_query, extracted_symptoms, system_response, score, openAI_response)
-            VALUES
-                (%s, %s, %s, %s, %s)
-        """
-
-        # 3. Execute one or multiple inserts
-        cursor.executemany(sql, records)
-
-        # 4. Commit to persist changes
+        cursor.executemany(INTERACTIONS_SQL, records)
         conn.commit()
-        print(f"{cursor.rowcount} record(s) inserted, last insert ID: {cursor.lastrowid}")
+        logger.debug("%d record(s) inserted, last insert ID: %s", cursor.rowcount, cursor.lastrowid)
 
     except Error as e:
-        print("Error:", e)
+        errors_total.inc(stage="db_write")
+        logger.error("Error writing %d interaction record(s): %s", len(records), e)
     finally:
-        # 5. Clean up
         if cursor:
             cursor.close()
-        if conn and conn.is_connected():
+        if conn:
+            # Returns the connection to the pool
             conn.close()
+        stage_seconds.observe(time.perf_counter() - started, stage="db_write")
+
+class InteractionLogWriter:
+    """
+    Write-behind queue for interaction records. Requests only enqueue a row;
+    a background thread flushes rows to `sink` in batches of up to
+    `batch_size`, or whatever arrived within `flush_interval` seconds.
+
+    The queue is bounded: when it is full new rows are dropped and counted
+    in `dropped` rather than blocking the request.
+    """
+
+    _STOP = object()
+
+    def __init__(self, sink, maxsize=10000, batch_size=100, flush_interval=1.0):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, record):
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("Interaction log queue full, dropped record (%d dropped so far)", self.dropped)
+
+    def _ensure_started(self):
+        # Also restarts the flusher in a forked worker, where the thread is gone
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="interaction-log", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                return
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+            if stop:
+                return
+
+    def _flush(self, batch):
+        try:
+            self.sink(batch)
+            self.written += len(batch)
+        except Exception as e:
+            logger.error("Error flushing %d interaction record(s): %s", len(batch), e)
+
+    def close(self, timeout=10.0):
+        """Drains everything queued so far and stops the flusher thread."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._queue.put(self._STOP, timeout=timeout)
+        self._thread.join(timeout)
+
+interaction_log = InteractionLogWriter(
+    write_interactions,
+    maxsize=INTERACTION_QUEUE_SIZE,
+    batch_size=INTERACTION_BATCH_SIZE,
+    flush_interval=INTERACTION_FLUSH_INTERVAL
+)
+# Streamlit pages call the pipeline in-process, so drain on interpreter exit too
+atexit.register(interaction_log.close)
+
+def insert_interactions(user_query, extracted_symptoms, system_response, score, openAI_response):
+    """
+    Queues one interaction record for the MySQL `interactions` table. The
+    write happens in the background, so this never waits on the database.
+    """
+    interaction_log.submit((_as_string(user_query), 
+                            _as_string(extracted_symptoms), 
+                            _as_string(system_response), 
+                            float(score) if score is not None else 0.0, 
+                            _as_string(openAI_response)))
+
+class ResponseCache:
+    """
+    Cache of LLM recommendations keyed on the normalized symptom set and the
+    IDs of the retrieved matches. Entries live in an in-memory LRU with a TTL;
+    when `path` is given they are also written through to a SQLite table so
+    they survive restarts and can be shared by workers on the same host.
+    """
+
+    def __init__(self, maxsize=1024, ttl=24 * 3600, path=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires_at, recommendation)
+        self._lock = threading.Lock()
+        self.path = path
+        self._db = None
+        self.reconnect()
+
+    def reconnect(self):
+        if not self.path:
+            return
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache "
+            "(key TEXT PRIMARY KEY, expires_at REAL, recommendation TEXT)"
+        )
+        self._db.execute("DELETE FROM response_cache WHERE expires_at < ?", (time.time(),))
+        self._db.commit()
+
+    def disable(self):
+        """Stops caching in both tiers; later gets miss and sets are dropped."""
+        with self._lock:
+            self.maxsize = 0
+            self._entries.clear()
+            if self._db is not None:
+                self._db.close()
+            # No path either, so `reconnect` after a fork does not reopen it
+            self.path = self._db = None
+
+    @staticmethod
+    def make_key(extracted_symptoms, matches):
+        symptoms = sorted({" ".join(s.lower().split()) for s in extracted_symptoms})
+        match_ids = sorted(m["id"] for m in matches)
+        return hashlib.sha256(json.dumps([symptoms, match_ids]).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is None and self._db is not None:
+                row = self._db.execute(
+                    "SELECT expires_at, recommendation FROM response_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[0] > now:
+                    entry = (row[0], row[1])
+                    self._store(key, entry)
+            if entry is None:
+                self.misses += 1
+                cache_lookups.inc(result="miss")
+                return None
+            if key in self._entries:  # not with maxsize=0
+                self._entries.move_to_end(key)
+            self.hits += 1
+            cache_lookups.inc(result="hit")
+            return entry[1]
+
+    def set(self, key, recommendation):
+        entry = (time.time() + self.ttl, recommendation)
+        with self._lock:
+            self._store(key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO response_cache (key, expires_at, recommendation) VALUES (?, ?, ?)",
+                    (key, entry[0], entry[1])
+                )
+                self._db.commit()
+
+    # The async endpoints' versions: with a SQLite tier, its queries and
+    # commits run on the default executor instead of blocking the event loop
+    async def get_async(self, key):
+        if self._db is None:
+            return self.get(key)
+        return await asyncio.get_running_loop().run_in_executor(None, self.get, key)
+
+    async def set_async(self, key, recommendation):
+        if self._db is None:
+            return self.set(key, recommendation)
+        await asyncio.get_running_loop().run_in_executor(None, self.set, key, recommendation)
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+            "persistent": self._db is not None
+        }
+
+response_cache = ResponseCache(
+    maxsize=RESPONSE_CACHE_SIZE,
+    ttl=RESPONSE_CACHE_TTL,
+    path=RESPONSE_CACHE_PATH
+)
+
+# Concurrent requests with the same normalized query share one retrieval, and
+# concurrent LLM calls for the same symptoms and matches (the response cache
+# key) share one completion. Sync endpoints use the thread versions, the
+# async ones the asyncio versions
+retrieval_flights = SingleFlight("retrieval", singleflight_total)
+retrieval_flights_async = AsyncSingleFlight("retrieval", singleflight_total)
+llm_flights = SingleFlight("llm", singleflight_total)
+llm_flights_async = AsyncSingleFlight("llm", singleflight_total)
 
 class QueryRequest(BaseModel):
     query: str
+    # Limit the search to diseases of these doshas, e.g. "Pitta" or the
+    # prakriti quiz result "Vata and Pitta"; unset searches everything
+    dosha: Optional[str] = None
 
-@app.post("/get_remedy")
-def get_remedy(request: QueryRequest):
-    user_input = request.query   
-    doc = nlp(user_input)
-    extracted_symptoms = [ent.text for ent in doc.ents if ent.label_ == "SYMPTOM"]
-    print("Extracted Symptoms:", extracted_symptoms)
+class BatchQueryRequest(BaseModel):
+    queries: List[str]
+    dosha: Optional[str] = None
 
-    if not extracted_symptoms:
-        print("No symptoms detected.")
-        return {"recommendation": "I'm sorry, I couldn't identify any symptoms in your input. Please provide more details about your symptoms."}
+NO_SYMPTOMS_MESSAGE = "I'm sorry, I couldn't identify any symptoms in your input. Please provide more details about your symptoms."
+N_RESULTS = 3
+LLM_MODEL = "gpt-5-mini"
+BATCH_NER_SIZE = 64
+BATCH_EMBED_SIZE = 64
+BATCH_LLM_WORKERS = 8
+# Hits fetched per symptom in the per_symptom retrieval mode, before fusion
+PER_SYMPTOM_RESULTS = 10
+# Sentence hits fetched per query before collapsing them to N_RESULTS diseases
+AGGREGATION_FETCH = 30
+
+def extract_symptoms(doc):
+    return [ent.text for ent in doc.ents if ent.label_ == "SYMPTOM"]
+
+# How often each symptom extraction path was taken: "matcher", "ner" or "none"
+extraction_paths = Counter()
+_extraction_paths_lock = threading.Lock()
+
+def _count_path(path, n=1):
+    with _extraction_paths_lock:
+        extraction_paths[path] += n
+
+def match_symptoms(user_input):
+    """Gazetteer lookup; an empty list when it is disabled or finds nothing."""
+    if not SYMPTOM_MATCHER:
+        return []
+    return get_symptom_matcher().match(user_input)
+
+def find_symptoms(user_input):
+    with stage_timer("symptom_match"):
+        symptoms = match_symptoms(user_input)
+    if symptoms:
+        _count_path("matcher")
+        return symptoms
+    with stage_timer("ner"):
+        symptoms = extract_symptoms(get_nlp()(user_input))
+    _count_path("ner" if symptoms else "none")
+    return symptoms
+
+def find_symptoms_batch(user_inputs):
+    """`find_symptoms` for many queries, running NER in one `nlp.pipe` pass over the matcher's misses."""
+    with stage_timer("symptom_match"):
+        symptoms_per_query = [match_symptoms(user_input) for user_input in user_inputs]
+    misses = [i for i, symptoms in enumerate(symptoms_per_query) if not symptoms]
+    _count_path("matcher", len(user_inputs) - len(misses))
+    if misses:
+        with stage_timer("ner"):
+            docs = get_nlp().pipe([user_inputs[i] for i in misses], batch_size=BATCH_NER_SIZE)
+            for i, doc in zip(misses, docs):
+                symptoms_per_query[i] = extract_symptoms(doc)
+                _count_path("ner" if symptoms_per_query[i] else "none")
+    return symptoms_per_query
+
+def match_dict(results, q, i):
+    """The i-th hit of the q-th query of a `collection.query` result as a match dict."""
+    metadata = results['metadatas'][q][i]
+    disease = get_disease_store().get(metadata.get('disease_id'))
+    if disease is None:
+        # Record written before the disease store (its disease and one remedy
+        # are inline), or a store older than the vectors
+        remedy = metadata.get('remedy')
+        disease = {
+            "disease": metadata.get('disease', metadata.get('disease_id')),
+            "dosha": metadata.get('dosha', ""),
+            "remedies": {"other": [remedy]} if remedy else {}
+        }
+    return {
+        "id": results['ids'][q][i],
+        "disease_id": metadata.get('disease_id'),
+        "symptoms": results['documents'][q][i],
+        "disease": disease['disease'],
+        "dosha": disease['dosha'],
+        "remedies": disease['remedies'],
+        "similarity": 1 - results['distances'][q][i]
+    }
+
+def log_matches(matches, avgscore):
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    for rank, match in enumerate(matches, start=1):
+        logger.debug(
+            "Match #%d\nScore (distance): %s\nSimilarity: %s\nMatched Symptoms: %s\nDisease: %s\nDosha: %s\nRemedies: %s",
+            rank, 1 - match["similarity"], match["similarity"], match["symptoms"],
+            match["disease"], match["dosha"], json.dumps(match["remedies"], indent=2)
+        )
+    logger.debug("Average Score (distance): %s", avgscore)
+
+def collect_matches(results, q=0, positions=None):
+    """
+    Turns the q-th query of a `collection.query` result into match dicts.
+
+    :param positions: hits to keep, all of them by default
+    :return: (matches, average distance)
+    """
+    if positions is None:
+        positions = range(len(results['ids'][q]))
+    matches = [match_dict(results, q, i) for i in positions]
+    avgscore = sum(1 - match["similarity"] for match in matches) / len(matches)
+    log_matches(matches, avgscore)
+    return matches, avgscore
+
+def fuse_matches(results, rows, symptoms):
+    """
+    Per-symptom hit lists `rows` of `results`, fused into the top N_RESULTS
+    diseases (see retrieval.fuse). Each match is the disease's closest hit,
+    plus its fused `score` and the extracted symptoms that found it.
+
+    :return: (matches, average distance)
+    """
+    matches = []
+    fused = retrieval.fuse(results, rows, get_disease_index(), RETRIEVAL_FUSION, N_RESULTS)
+    for q, i, score, found_by in fused:
+        match = match_dict(results, q, i)
+        match["score"] = score
+        match["matched_symptoms"] = [symptoms[s] for s in found_by]
+        matches.append(match)
+    avgscore = sum(1 - match["similarity"] for match in matches) / len(matches)
+    log_matches(matches, avgscore)
+    return matches, avgscore
+
+def search_symptoms(symptoms_per_query, doshas=()):
+    """
+    Embedding and vector search for queries with symptoms, in one batched
+    `embedder.encode` and one multi-query `collection.query` call whatever
+    the number of queries or, in the per_symptom mode, of symptoms.
+
+    :param doshas: limit the search to these doshas' diseases (see retrieval.dosha_filter)
+    :return: (matches, avgscore) per query
+    """
+    per_symptom = RETRIEVAL_MODE == "per_symptom"
+    if per_symptom:
+        texts = [symptom for symptoms in symptoms_per_query for symptom in symptoms]
+        n_results = PER_SYMPTOM_RESULTS
     else:
-        # Step 3: Embed extracted symptoms
-        query_embedding = embedder.encode(", ".join(extracted_symptoms)).tolist()
+        texts = [", ".join(symptoms) for symptoms in symptoms_per_query]
+        n_results = AGGREGATION_FETCH if DISEASE_AGGREGATION else N_RESULTS
 
-        results = collection.query(
-            query_embeddings=[query_embedding],
-            n_results=3
+    with stage_timer("embedding"):
+        query_embeddings = get_embedder().encode(texts, batch_size=BATCH_EMBED_SIZE).tolist()
+    where = retrieval.dosha_filter(doshas)
+    with stage_timer("vector_query"):
+        results = get_search_index().query(
+            query_embeddings=query_embeddings,
+            n_results=n_results,
+            where=where
         )
-        matches = []
-        calcscore = 0
-        for i, doc in enumerate(results['documents'][0]):
-            score = results['distances'][0][i]
-            similarity = 1 - score
-            print(f"\nMatch #{i+1}")
-            print("Score (distance):", score)
-            print("Similarity:", similarity)
-            print("Matched Symptoms:", doc)
-            print("Disease:", results['metadatas'][0][i]['disease'])
-            print("Dosha:", results['metadatas'][0][i]['dosha'])
-            print("Remedies:", json.dumps(results['metadatas'][0][i]['remedy'], indent=2))
-            calcscore += score
-            matches.append({
-                "symptoms": doc,
-                "disease": results['metadatas'][0][i]['disease'],
-                "dosha": results['metadatas'][0][i]['dosha'],
-                "remedy": json.dumps(results['metadatas'][0][i]['remedy'], indent=2),
-                "similarity": similarity
-            })
-        avgscore = calcscore / len(matches)
-        print("Average Score (distance):", avgscore)
-
-        context_text = "\n\n".join([
-        f"Match {i+1} (Similarity: {m['similarity']:.2f}):\n"
-        f"Symptoms: {m['symptoms']}\n"
-        f"Disease: {m['disease']}\n"
-        f"Dosha: {m['dosha']}\n"
-        f"Remedy: {json.dumps(m['remedy'], indent=2)}"
-        for i, m in enumerate(matches)
-            ])
-
-        prompt = f"""
-        You are an Ayurvedic assistant. The patient reports: {user_input}.
-        We have the following top 3 matches from our database:
-
-        {context_text}
-
-        Based on this information, choose the most relevant match and explain it to the user clearly. 
-        Include the disease name, dosha, and remedies in natural language.
-        """
-        
-        response = OpenAIClient.chat.completions.create(
-            model="gpt-5-mini",
-            messages=[
-                {"role": "system", "content": "You are an expert Ayurveda medical assistant."},
-                {"role": "user", "content": prompt}
-            ]
+        if where is not None and not all(results["ids"]):
+            # A store built before the dosha fields existed matches nothing
+            logger.warning("Dosha filter %s matched no vectors; searching without it", doshas)
+            results = get_search_index().query(
+                query_embeddings=query_embeddings,
+                n_results=n_results
+            )
+
+    if not per_symptom:
+        if not DISEASE_AGGREGATION:
+            return [collect_matches(results, q) for q in range(len(texts))]
+        disease_index = get_disease_index()
+        return [
+            collect_matches(results, q, retrieval.aggregate(results, q, disease_index, N_RESULTS))
+            for q in range(len(texts))
+        ]
+    contexts, start = [], 0
+    for symptoms in symptoms_per_query:
+        contexts.append(fuse_matches(results, range(start, start + len(symptoms)), symptoms))
+        start += len(symptoms)
+    return contexts
+
+def build_prompt(user_input, matches):
+    """User message for the LLM; the instructions are in the system message (see prompt_builder.py)."""
+    with stage_timer("prompt_build"):
+        prompt, tokens = prompt_builder.build_prompt(user_input, matches, PROMPT_TOKEN_BUDGET, LLM_MODEL)
+    prompt_tokens.observe(tokens)
+    logger.debug("Prompt (%d tokens): %s", tokens, prompt)
+    return prompt
+
+def bypass_llm(matches):
+    """True when the top match is close enough to answer from its metadata alone."""
+    return LLM_BYPASS_SIMILARITY is not None and matches[0]["similarity"] >= LLM_BYPASS_SIMILARITY
+
+def render_template_answer(matches):
+    """
+    Deterministic answer built from the top match, with the remedies of every
+    other top match for the same disease, for when the LLM is bypassed.
+    """
+    top = matches[0]
+    remedies = prompt_builder.group_by_disease(matches)[0]["remedies"]
+
+    dosha = f", a condition Ayurveda associates with {top['dosha']} dosha" if top["dosha"] else ""
+    lines = [
+        f"Your symptoms most closely match **{top['disease']}**{dosha}.",
+        "",
+        f"Matched symptoms: {top['symptoms']}",
+        "",
+        "Suggested Ayurvedic remedies:",
+        *(line for category, items in remedies.items()
+          for line in ["", f"*{category.title()}*", *(f"- {remedy}" for remedy in items)]),
+        "",
+        "This is general Ayurvedic guidance, not a diagnosis. Please consult a qualified "
+        "practitioner if your symptoms persist or get worse."
+    ]
+    return "\n".join(lines)
+
+def llm_messages(prompt):
+    return [
+        {"role": "system", "content": prompt_builder.SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+def record_usage(usage):
+    if usage is not None:
+        llm_tokens.inc(usage.prompt_tokens, kind="prompt")
+        llm_tokens.inc(usage.completion_tokens, kind="completion")
+
+def ask_openai(prompt):
+    with stage_timer("llm"):
+        response = get_openai_client().chat.completions.create(
+            model=LLM_MODEL,
+            messages=llm_messages(prompt)
+        )
+    record_usage(getattr(response, "usage", None))
+    return response.choices[0].message.content
+
+async def ask_openai_async(prompt):
+    with stage_timer("llm"):
+        response = await get_async_openai_client().chat.completions.create(
+            model=LLM_MODEL,
+            messages=llm_messages(prompt)
+        )
+    record_usage(getattr(response, "usage", None))
+    return response.choices[0].message.content
+
+def stream_openai(prompt):
+    """Yields completion tokens as OpenAI produces them."""
+    # Timed up to the last token, so it is comparable with the non-streaming calls
+    with stage_timer("llm"):
+        stream = get_openai_client().chat.completions.create(
+            model=LLM_MODEL,
+            messages=llm_messages(prompt),
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        for chunk in stream:
+            # The usage comes in a last chunk without choices
+            record_usage(getattr(chunk, "usage", None))
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+async def stream_openai_async(prompt):
+    with stage_timer("llm"):
+        stream = await get_async_openai_client().chat.completions.create(
+            model=LLM_MODEL,
+            messages=llm_messages(prompt),
+            stream=True,
+            stream_options={"include_usage": True}
         )
+        async for chunk in stream:
+            record_usage(getattr(chunk, "usage", None))
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+def retrieve_matches(user_input, doshas=()):
+    """
+    Runs symptom extraction, embedding and vector search for one query.
+
+    :return: (extracted_symptoms, matches, avgscore); matches is None when
+             no symptoms were found
+    """
+    extracted_symptoms = find_symptoms(user_input)
+    logger.debug("Extracted Symptoms: %s", extracted_symptoms)
+
+    if not extracted_symptoms:
+        logger.debug("No symptoms detected.")
+        no_symptom_responses.inc()
+        return extracted_symptoms, None, None
+
+    # Step 3: Embed extracted symptoms and search
+    (matches, avgscore), = search_symptoms([extracted_symptoms], doshas)
+    return extracted_symptoms, matches, avgscore
+
+def normalize_query(user_input):
+    return " ".join(user_input.lower().split())
+
+def shared_retrieve_matches(user_input, doshas=()):
+    """`retrieve_matches`, run once for all concurrent requests with the same normalized query and doshas."""
+    result, _ = retrieval_flights.do((normalize_query(user_input), doshas), retrieve_matches, user_input, doshas)
+    return result
+
+async def shared_retrieve_matches_async(user_input, doshas=()):
+    """Async `shared_retrieve_matches`: the leader runs on `cpu_executor`, followers hold no thread."""
+    loop = asyncio.get_running_loop()
+    result, _ = await retrieval_flights_async.do(
+        (normalize_query(user_input), doshas), loop.run_in_executor, cpu_executor, retrieve_matches, user_input, doshas)
+    return result
+
+def shared_completion(cache_key, user_input, matches):
+    """LLM answer for a cache miss, cached; concurrent misses for the same key share one call."""
+    def complete():
+        # The previous leader for this key may have cached it since our miss
+        recommendation = response_cache.get(cache_key)
+        if recommendation is None:
+            recommendation = ask_openai(build_prompt(user_input, matches))
+            response_cache.set(cache_key, recommendation)
+        return recommendation
+    return llm_flights.do(cache_key, complete)[0]
+
+async def shared_completion_async(cache_key, user_input, matches):
+    async def complete():
+        recommendation = await response_cache.get_async(cache_key)
+        if recommendation is None:
+            recommendation = await ask_openai_async(build_prompt(user_input, matches))
+            await response_cache.set_async(cache_key, recommendation)
+        return recommendation
+    return (await llm_flights_async.do(cache_key, complete))[0]
+
+@app.post("/get_remedy")
+def get_remedy(request: QueryRequest):
+    user_input = request.query   
+    extracted_symptoms, matches, avgscore = shared_retrieve_matches(user_input, retrieval.parse_doshas(request.dosha))
+
+    if matches is None:
+        return {"recommendation": NO_SYMPTOMS_MESSAGE}
+    else:
+        # A confident match or a cache hit skips the LLM round trip entirely
+        if bypass_llm(matches):
+            recommendation, answer_source = render_template_answer(matches), "template"
+        else:
+            cache_key = response_cache.make_key(extracted_symptoms, matches)
+            recommendation, answer_source = response_cache.get(cache_key), "cache"
+            if recommendation is None:
+                recommendation, answer_source = shared_completion(cache_key, user_input, matches), "llm"
+        answers_total.inc(source=answer_source)
         
         #response = "The best match is Match 1: Acne \u2014 a Pitta-type condition. Pitta imbalance in the skin produces heat and inflammation, so acne often appears as red, inflamed pimples that can flare with emotional stress, premenstrual or hormonal changes, too much sun, chemical exposure, or bacterial irritation.\n\nRecommended Ayurvedic approach (what to do):\n\n1. Internal/herbal remedies\n- Cumin\u2013coriander\u2013fennel tea: 1/3 teaspoon each, steep and drink after meals, three times daily \u2014 cooling and digestion-supporting. \n- Kutki + guduchi + shatavari: about 1/4 teaspoon (combined) after meals, 2\u20133 times/day \u2014 helps reduce internal heat and supports liver/immune balance. \n- Amalaki powder (Indian gooseberry): 1/2\u20131 teaspoon before bed \u2014 cooling and antioxidant. \n- Aloe vera juice: 1/2 cup twice daily \u2014 soothes and cools Pitta.\n\n2. Topical, external care\n- Almond paste: apply on affected areas and leave for ~30 minutes, then rinse \u2014 gentle nourishment. \n- Sandalwood + turmeric paste mixed with goat\u2019s milk: cooling, anti-inflammatory paste for spot application. \n- Chickpea (gram) flour paste: gentle cleanser/mask to absorb oil and calm skin. \n- Rubbing melon on the skin overnight or using fresh cooling pulp can soothe inflamed spots.\n\n3. Diet and daily regimen (pathya)\n- Follow a Pitta\u2011pacifying diet: favor bland, cooling foods \u2014 rice, oatmeal, applesauce. \n- Avoid spicy, fried, fermented, very salty foods and citrus fruits, and reduce alcohol and caffeine. \n- Limit direct sun exposure and avoid chemical irritants on skin (harsh cosmetics).\n\n4. Lifestyle, stress and breathing\n- Manage stress with visualization/meditation. \n- Practice left\u2011nostril breathing (Chandra/soft-moon breath) 5\u201310 minutes daily to calm Pitta. \n- Gentle yoga: Moon salutation and Lion pose can be helpful. \n- Reduce behaviors that increase emotional strain (for example, avoid frequent mirror\u2011checking).\n\n5. Miscellaneous\n- Keep the face clean with gentle, non\u2011irritating products. Avoid harsh scrubs or frequent picking. \n- If there are signs of a bacterial infection (increasing pain, warmth, spreading redness, fever) or severe/nodular acne, see a dermatologist for evaluation and possible medical treatment.\n\nIf you\u2019d like, I can turn this into a simple daily plan (what to take/when and a short morning/evening routine) based on your current medications and any allergies."
-        print("Response from OpenAI:", response.choices[0].message.content)
-        insert_interactions(user_input, extracted_symptoms, matches, avgscore, response.choices[0].message.content)
+        logger.debug("Response from OpenAI: %s", recommendation)
+        insert_interactions(user_input, extracted_symptoms, matches, avgscore, recommendation)
         
         return {
         "extracted_symptoms": extracted_symptoms,
         "matches": matches,
-        "recommendation": response.choices[0].message.content
+        "recommendation": recommendation,
+        "answer_source": answer_source
         }
 
-#--------------UI Code from ui.py------------------
-import streamlit as st
-import requests
-import re
-import app as app
-from app import get_remedy, QueryRequest
+@app.post("/get_remedy_async")
+async def get_remedy_async(request: QueryRequest):
+    """
+    Async version of /get_remedy. NER, embedding and vector search run on
+    `cpu_executor` and the LLM call goes through the async OpenAI client, so
+    the event loop can keep many slow completions in flight at once.
+    """
+    user_input = request.query
+    extracted_symptoms, matches, avgscore = await shared_retrieve_matches_async(
+        user_input, retrieval.parse_doshas(request.dosha))
+
+    if matches is None:
+        return {"recommendation": NO_SYMPTOMS_MESSAGE}
+
+    if bypass_llm(matches):
+        recommendation, answer_source = render_template_answer(matches), "template"
+    else:
+        cache_key = response_cache.make_key(extracted_symptoms, matches)
+        recommendation, answer_source = await response_cache.get_async(cache_key), "cache"
+        if recommendation is None:
+            recommendation, answer_source = await shared_completion_async(cache_key, user_input, matches), "llm"
+    answers_total.inc(source=answer_source)
+    logger.debug("Response from OpenAI: %s", recommendation)
+    insert_interactions(user_input, extracted_symptoms, matches, avgscore, recommendation)
+
+    return {
+        "extracted_symptoms": extracted_symptoms,
+        "matches": matches,
+        "recommendation": recommendation,
+        "answer_source": answer_source
+    }
+
+def stream_remedy(user_input, dosha=None):
+    """
+    In-process streaming version of get_remedy for the Streamlit chat pages.
+    Yields the recommendation token by token and logs the interaction once
+    the completion has finished.
+
+    :param dosha: as QueryRequest.dosha, e.g. the prakriti quiz result
+    """
+    extracted_symptoms, matches, avgscore = shared_retrieve_matches(user_input, retrieval.parse_doshas(dosha))
+    if matches is None:
+        yield NO_SYMPTOMS_MESSAGE
+        return
 
-#API_URL = "http://localhost:8000/get_remedy"
-API_URL = "http://127.0.0.1:8000/get_remedy"
+    if bypass_llm(matches):
+        recommendation, answer_source = render_template_answer(matches), "template"
+        yield recommendation
+    else:
+        cache_key = response_cache.make_key(extracted_symptoms, matches)
+        recommendation, answer_source = response_cache.get(cache_key), "cache"
+        if recommendation is not None:
+            yield recommendation
+        else:
+            call, leader = llm_flights.join(cache_key)
+            if not leader:
+                # The same answer was streamed to another request (when that
+                # one went away before the end, this request leads instead)
+                recommendation = call.wait()
+                yield recommendation
+            else:
+                tokens = []
+                try:
+                    for token in stream_openai(build_prompt(user_input, matches)):
+                        tokens.append(token)
+                        yield token
+                except BaseException as e:
+                    llm_flights.finish(cache_key, call, error=e)
+                    raise
+                recommendation = "".join(tokens)
+                response_cache.set(cache_key, recommendation)
+                llm_flights.finish(cache_key, call, recommendation)
+            answer_source = "llm"
+    answers_total.inc(source=answer_source)
+    insert_interactions(user_input, extracted_symptoms, matches, avgscore, recommendation)
 
-st.set_page_config(page_title="Ayurveda Remedy Chatbot", page_icon="🌿",layout="wide")
-st.title("🪷 Ayurveda Remedy Recommender")
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
-if "messages" not in st.session_state:
-    st.session_state["messages"] = [{"role": "assistant", "content": "How can I help you?"}]
+async def _remedy_events(user_input, doshas=()):
+    extracted_symptoms, matches, avgscore = await shared_retrieve_matches_async(user_input, doshas)
 
-for msg in st.session_state.messages:
-    st.chat_message(msg["role"]).write(msg["content"])
+    if matches is None:
+        yield _sse("token", NO_SYMPTOMS_MESSAGE)
+        yield _sse("done", {})
+        return
 
-if prompt := st.chat_input():
-    st.session_state.messages.append({"role": "user", "content": prompt})
-    st.chat_message("user").write(prompt)
-    with st.spinner("Finding remedy..."):            
-        response = get_remedy(QueryRequest(query=prompt))
-    msg = response["recommendation"]
-    st.session_state.messages.append({"role": "assistant", "content": msg})
-    st.chat_message("assistant").write(msg)
+    yield _sse("matches", {"extracted_symptoms": extracted_symptoms, "matches": matches})
+    if bypass_llm(matches):
+        recommendation, answer_source = render_template_answer(matches), "template"
+        yield _sse("token", recommendation)
+    else:
+        cache_key = response_cache.make_key(extracted_symptoms, matches)
+        recommendation, answer_source = await response_cache.get_async(cache_key), "cache"
+        if recommendation is not None:
+            yield _sse("token", recommendation)
+        else:
+            future, leader = await llm_flights_async.join(cache_key)
+            if not leader:
+                # The same answer was streamed to another request (when that
+                # one disconnected before the end, this request leads instead)
+                recommendation = future.result()
+                yield _sse("token", recommendation)
+            else:
+                tokens = []
+                try:
+                    async for token in stream_openai_async(build_prompt(user_input, matches)):
+                        tokens.append(token)
+                        yield _sse("token", token)
+                except BaseException as e:
+                    llm_flights_async.finish(cache_key, future, error=e)
+                    raise
+                recommendation = "".join(tokens)
+                try:
+                    await response_cache.set_async(cache_key, recommendation)
+                finally:
+                    # Followers get the answer even if this client goes away during the write
+                    llm_flights_async.finish(cache_key, future, recommendation)
+            answer_source = "llm"
+    # Logged before `done`: a client may disconnect as soon as it sees it
+    answers_total.inc(source=answer_source)
+    insert_interactions(user_input, extracted_symptoms, matches, avgscore, recommendation)
+    yield _sse("done", {"answer_source": answer_source})
 
+@app.post("/get_remedy_stream")
+async def get_remedy_stream(request: QueryRequest):
+    """
+    Server-sent events version of /get_remedy. Emits one `matches` event once
+    retrieval is done, then a `token` event per completion token as OpenAI
+    produces it, then `done` with the `answer_source`. Every `data:` payload
+    is JSON encoded.
+    """
+    return StreamingResponse(
+        _remedy_events(request.query, retrieval.parse_doshas(request.dosha)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
+@app.post("/get_remedy_batch")
+def get_remedy_batch(request: BatchQueryRequest):
+    """
+    Same pipeline as /get_remedy for many queries at once: one `nlp.pipe` pass
+    over the queries the symptom matcher misses, one batched `embedder.encode`
+    call and one multi-query `collection.query`.
+    The LLM calls are the only per-query step and run on a small thread pool;
+    queries with the same symptoms and matches share one call.
+    """
+    user_inputs = request.queries
+    symptoms_per_query = find_symptoms_batch(user_inputs)
+    responses = [{"recommendation": NO_SYMPTOMS_MESSAGE} for _ in user_inputs]
+
+    # Only queries with symptoms go through retrieval and the LLM
+    pending = [i for i, symptoms in enumerate(symptoms_per_query) if symptoms]
+    no_symptom_responses.inc(len(user_inputs) - len(pending))
+    if not pending:
+        return {"results": responses}
 
+    contexts = search_symptoms([symptoms_per_query[i] for i in pending], retrieval.parse_doshas(request.dosha))
+    cache_keys = [response_cache.make_key(symptoms_per_query[i], matches) for i, (matches, _) in zip(pending, contexts)]
+    recommendations, sources = [], []
+    for (matches, _), key in zip(contexts, cache_keys):
+        if bypass_llm(matches):
+            recommendations.append(render_template_answer(matches))
+            sources.append("template")
+        else:
+            recommendations.append(response_cache.get(key))
+            sources.append("cache")
 
+    # Only cache misses go to the LLM, once per distinct key
+    misses = {}
+    for q, recommendation in enumerate(recommendations):
+        if recommendation is None:
+            misses.setdefault(cache_keys[q], []).append(q)
+    if misses:
+        with ThreadPoolExecutor(max_workers=BATCH_LLM_WORKERS) as pool:
+            completions = pool.map(
+                lambda qs: shared_completion(cache_keys[qs[0]], user_inputs[pending[qs[0]]], contexts[qs[0]][0]),
+                misses.values())
+            for qs, recommendation in zip(misses.values(), completions):
+                for q in qs:
+                    recommendations[q], sources[q] = recommendation, "llm"
 
+    for i, (matches, avgscore), recommendation, source in zip(pending, contexts, recommendations, sources):
+        answers_total.inc(source=source)
+        insert_interactions(user_inputs[i], symptoms_per_query[i], matches, avgscore, recommendation)
+        responses[i] = {
+            "extracted_symptoms": symptoms_per_query[i],
+            "matches": matches,
+            "recommendation": recommendation,
+            "answer_source": source
+        }
+    return {"results": responses}
 
 
+@app.get("/cache_stats")
+def cache_stats():
+    return response_cache.stats()
 
+@app.get("/metrics")
+def get_metrics():
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
 
+@app.get("/extraction_stats")
+def extraction_stats():
+    with _extraction_paths_lock:
+        paths = dict(extraction_paths)
+    total = sum(paths.values())
+    return {
+        "paths": paths,
+        "total": total,
+        "matcher_rate": paths.get("matcher", 0) / total if total else 0.0
+    }
 
+@app.get("/startup_report")
+def get_startup_report():
+    return startup_report()
 
+@app.get("/healthz")
+def healthz():
+    return {"status": "ok"}
 
+@app.get("/readyz")
+def readyz():
+    if _warmup_error is not None:
+        return JSONResponse(status_code=503, content={"status": "warmup failed", "error": repr(_warmup_error), **startup_report()})
+    if not _ready.is_set():
+        return JSONResponse(status_code=503, content={"status": "warming up", **startup_report()})
+    return {"status": "ready"}
 
+startup_timings["import app"] = time.perf_counter() - _import_started
+# `streamlit run app.py` executes this file as __main__ on every rerun; the
+# chat UI below uses the imported `app` module, which loads the models once
+if not LAZY_STARTUP and __name__ != "__main__":
+    warmup()
 
 
+#--------------UI Code from ui.py------------------
+if __name__ == "__main__":
+    import streamlit as st
+    import app as api
+
+    #API_URL = "http://localhost:8000/get_remedy"
+    API_URL = "http://127.0.0.1:8000/get_remedy"
 
+    st.set_page_config(page_title="Ayurveda Remedy Chatbot", page_icon="🌿",layout="wide")
+    st.title("🪷 Ayurveda Remedy Recommender")
 
+    if "messages" not in st.session_state:
+        st.session_state["messages"] = [{"role": "assistant", "content": "How can I help you?"}]
 
+    for msg in st.session_state.messages:
+        st.chat_message(msg["role"]).write(msg["content"])
 
+    if prompt := st.chat_input():
+        st.session_state.messages.append({"role": "user", "content": prompt})
+        st.chat_message("user").write(prompt)
+        msg = st.chat_message("assistant").write_stream(api.stream_remedy(prompt))
+        st.session_state.messages.append({"role": "assistant", "content": msg})
@@ -0,0 +1,123 @@
+"""
+Compares the PyTorch and int8 ONNX backends of the all-MiniLM-L6-v2 embedder.
+
+Reports model load time, single-sentence encode latency (p50/p99), batched
+throughput and peak RSS. Every backend runs in its own subprocess so the
+RSS of one does not include the other's libraries and weights.
+
+    python benchmark_embedder.py --onnx-model-dir ./onnx_embedder --output embedder_bench.json
+
+The sentences are the symptom phrases in cleaned_ayurveda_data.json, the
+kind of text /get_remedy embeds.
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def load_embedder(backend, onnx_model_dir, threads=None):
+    if backend == "onnx":
+        from onnx_embedder import OnnxEmbedder
+
+        return OnnxEmbedder(onnx_model_dir, threads=threads)
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    if threads:
+        torch.set_num_threads(threads)
+
+    return SentenceTransformer("all-MiniLM-L6-v2")
+
+
+def run_backend(args):
+    """Benchmarks one backend in this process and prints its report as JSON."""
+    with open(args.data, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    sentences = [symptom for entry in data for symptom in entry.get("symptoms", [])][: args.limit]
+    rss_before = peak_rss_mb()
+
+    start = time.perf_counter()
+    embedder = load_embedder(args.worker, args.onnx_model_dir, args.threads)
+    load_seconds = time.perf_counter() - start
+    rss_loaded = peak_rss_mb()
+
+    embedder.encode(sentences[:8])  # warm up
+    latencies = []
+    for _ in range(args.repeat):
+        for sentence in sentences:
+            start = time.perf_counter()
+            embedder.encode(sentence)
+            latencies.append(time.perf_counter() - start)
+    ms = np.asarray(latencies) * 1000.0
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        embedder.encode(sentences, batch_size=args.batch_size)
+    batch_seconds = (time.perf_counter() - start) / args.repeat
+
+    print(json.dumps({
+        "sentences": len(sentences),
+        "load_seconds": load_seconds,
+        "single_mean_ms": float(ms.mean()),
+        "single_p50_ms": float(np.percentile(ms, 50)),
+        "single_p99_ms": float(np.percentile(ms, 99)),
+        "batch_size": args.batch_size,
+        "batch_sentences_per_second": len(sentences) / batch_seconds,
+        "rss_before_load_mb": rss_before,
+        "rss_after_load_mb": rss_loaded,
+        "rss_peak_mb": peak_rss_mb(),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx"], choices=["torch", "onnx"])
+    parser.add_argument("--onnx-model-dir", default="./onnx_embedder")
+    parser.add_argument("--data", default="cleaned_ayurveda_data.json")
+    parser.add_argument("--limit", type=int, default=500, help="maximum number of sentences")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--threads", type=int, help="intra-op threads for both backends (default: their own)")
+    parser.add_argument("--output", help="also write the report to this JSON file")
+    parser.add_argument("--worker", choices=["torch", "onnx"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_backend(args)
+        return
+
+    report = {}
+    for backend in args.backends:
+        command = [
+            sys.executable, __file__, "--worker", backend,
+            "--onnx-model-dir", args.onnx_model_dir, "--data", args.data,
+            "--limit", str(args.limit), "--repeat", str(args.repeat), "--batch-size", str(args.batch_size),
+        ]
+        if args.threads:
+            command += ["--threads", str(args.threads)]
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        report[backend] = json.loads(output.strip().splitlines()[-1])
+
+    if "torch" in report and "onnx" in report:
+        report["onnx_speedup"] = {
+            "single_p50": report["torch"]["single_p50_ms"] / report["onnx"]["single_p50_ms"],
+            "batch_throughput": report["onnx"]["batch_sentences_per_second"] / report["torch"]["batch_sentences_per_second"],
+        }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Speed and accuracy benchmark for the symptom NER model.
+
+Runs the model over annotated datasets with `nlp.pipe` and reports, per
+dataset, throughput (docs/sec), per-doc latency (p50/p99 of single `nlp()`
+calls) and entity-level precision/recall/F1, where a predicted entity only
+counts when its start, end and label all match an annotation exactly.
+
+    python benchmark_ner.py --batch-size 128 --n-process 2 --output ner_bench.json
+
+By default it scores the held-out dev split of the corpus built by
+build_ner_corpus.py and the per-symptom annotations of training_data.json.
+
+The JSON report carries the model's name, version and spaCy version, so
+reports of two model builds can be diffed before deploying one of them.
+"""
+import argparse
+import json
+import platform
+import time
+
+import numpy as np
+import spacy
+
+
+def load_docs(path, vocab=None):
+    """Reads the Docs of a DocBin corpus written by build_ner_corpus.py."""
+    from spacy.tokens import DocBin
+
+    return list(DocBin().from_disk(path).get_docs(vocab or spacy.blank("en").vocab))
+
+
+def load_examples(path):
+    """
+    Reads (text, [(start, end, label), ...]) pairs from a `.spacy` corpus or
+    a JSON file of `[text, {"entities": [[start, end, label], ...]}]` pairs,
+    the notebook's training format.
+    """
+    if path.endswith(".spacy"):
+        return [(doc.text, [(ent.start_char, ent.end_char, ent.label_) for ent in doc.ents]) for doc in load_docs(path)]
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return [(text, [tuple(ent) for ent in annotations.get("entities", [])]) for text, annotations in data]
+
+
+def score_entities(gold, predicted):
+    """
+    Exact-match entity scores over parallel lists of (start, end, label) lists.
+
+    :return: dict with micro-averaged precision/recall/f1, their counts and
+             the same scores per label
+    """
+    counts = {}
+    for gold_spans, predicted_spans in zip(gold, predicted):
+        gold_set, predicted_set = set(map(tuple, gold_spans)), set(map(tuple, predicted_spans))
+        for span in gold_set | predicted_set:
+            label = counts.setdefault(span[2], {"tp": 0, "fp": 0, "fn": 0})
+            if span in gold_set and span in predicted_set:
+                label["tp"] += 1
+            elif span in predicted_set:
+                label["fp"] += 1
+            else:
+                label["fn"] += 1
+
+    def prf(tp, fp, fn):
+        precision = tp / (tp + fp) if tp + fp else 0.0
+        recall = tp / (tp + fn) if tp + fn else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        return {"precision": precision, "recall": recall, "f1": f1, "tp": tp, "fp": fp, "fn": fn}
+
+    total = {key: sum(label[key] for label in counts.values()) for key in ("tp", "fp", "fn")}
+    scores = prf(**total)
+    scores["per_label"] = {name: prf(**label) for name, label in sorted(counts.items())}
+    return scores
+
+
+def predict(nlp, texts, batch_size, n_process):
+    """Runs `nlp.pipe` over all texts; returns (predicted spans per text, seconds)."""
+    start = time.perf_counter()
+    predicted = [
+        [(ent.start_char, ent.end_char, ent.label_) for ent in doc.ents]
+        for doc in nlp.pipe(texts, batch_size=batch_size, n_process=n_process)
+    ]
+    return predicted, time.perf_counter() - start
+
+
+def time_single_docs(nlp, texts):
+    latencies = []
+    for text in texts:
+        start = time.perf_counter()
+        nlp(text)
+        latencies.append(time.perf_counter() - start)
+    return np.asarray(latencies) * 1000.0
+
+
+def benchmark_dataset(nlp, examples, args):
+    texts = [text for text, _ in examples]
+    predict(nlp, texts[:args.batch_size], args.batch_size, 1)  # warm up
+    predicted, seconds = predict(nlp, texts, args.batch_size, args.n_process)
+    ms = time_single_docs(nlp, texts[:args.latency_docs])
+    return {
+        "docs": len(texts),
+        "pipe_seconds": seconds,
+        "docs_per_second": len(texts) / seconds if seconds else 0.0,
+        "latency_docs": len(ms),
+        "latency_p50_ms": float(np.percentile(ms, 50)) if len(ms) else None,
+        "latency_p99_ms": float(np.percentile(ms, 99)) if len(ms) else None,
+        "entities": score_entities([spans for _, spans in examples], predicted),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default="symptom_ner_model")
+    parser.add_argument("--data", nargs="+", default=["corpus/dev.spacy", "training_data.json"])
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--n-process", type=int, default=1)
+    parser.add_argument("--limit", type=int, help="only use the first N examples of each dataset")
+    parser.add_argument("--latency-docs", type=int, default=500,
+                        help="docs per dataset timed one at a time for the latency percentiles")
+    parser.add_argument("--output", help="also write the report to this JSON file")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    nlp = spacy.load(args.model)
+    load_seconds = time.perf_counter() - start
+
+    report = {
+        "model": {
+            "path": args.model,
+            "name": nlp.meta.get("name"),
+            "version": nlp.meta.get("version"),
+            "pipeline": nlp.pipe_names,
+            "load_seconds": load_seconds,
+        },
+        "spacy_version": spacy.__version__,
+        "python_version": platform.python_version(),
+        "batch_size": args.batch_size,
+        "n_process": args.n_process,
+        "datasets": {},
+    }
+    for path in args.data:
+        examples = load_examples(path)[:args.limit]
+        report["datasets"][path] = benchmark_dataset(nlp, examples, args)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
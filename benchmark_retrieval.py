@@ -0,0 +1,112 @@
+"""
+Compares the NumPy exact-search index against the Chroma collection.
+
+Reports per-query latency (p50/p99, single queries and one batched call)
+and recall@k of `collection.query` measured against the exact NumPy top-k.
+
+    python benchmark_retrieval.py --k 3 --output retrieval_bench.json
+
+By default the queries are the symptom phrases in cleaned_ayurveda_data.json
+embedded with all-MiniLM-L6-v2, like /get_remedy does. `--self-queries`
+uses the stored vectors themselves and needs no embedder.
+"""
+__import__('pysqlite3')
+import sys
+sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
+import argparse
+import json
+import time
+
+import chromadb
+import numpy as np
+
+from vector_index import NumpyIndex
+
+
+def load_query_embeddings(args, index):
+    if args.self_queries:
+        return index.embeddings[: args.limit]
+    from sentence_transformers import SentenceTransformer
+
+    with open(args.data, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    phrases = [symptom for entry in data for symptom in entry.get("symptoms", [])][: args.limit]
+    embedder = SentenceTransformer("all-MiniLM-L6-v2")
+    return embedder.encode(phrases, batch_size=64)
+
+
+def time_single_queries(search, queries, repeat):
+    latencies = []
+    for _ in range(repeat):
+        for q in queries:
+            start = time.perf_counter()
+            search([q.tolist()])
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def summarize(latencies):
+    ms = np.asarray(latencies) * 1000.0
+    return {
+        "queries": len(ms),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p99_ms": float(np.percentile(ms, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--store", default="./chromadb_store")
+    parser.add_argument("--collection", default="ayurveda_symptoms")
+    parser.add_argument("--data", default="cleaned_ayurveda_data.json")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--limit", type=int, default=1000, help="maximum number of queries")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--self-queries", action="store_true")
+    parser.add_argument("--output", help="also write the report to this JSON file")
+    args = parser.parse_args()
+
+    collection = chromadb.PersistentClient(path=args.store).get_collection(args.collection)
+
+    start = time.perf_counter()
+    index = NumpyIndex.from_collection(collection)
+    load_seconds = time.perf_counter() - start
+
+    queries = np.asarray(load_query_embeddings(args, index), dtype=np.float32)
+    query_list = queries.tolist()
+
+    chroma_single = time_single_queries(
+        lambda q: collection.query(query_embeddings=q, n_results=args.k), queries, args.repeat)
+    numpy_single = time_single_queries(
+        lambda q: index.query(q, n_results=args.k), queries, args.repeat)
+
+    start = time.perf_counter()
+    chroma_results = collection.query(query_embeddings=query_list, n_results=args.k)
+    chroma_batch = time.perf_counter() - start
+    start = time.perf_counter()
+    exact_results = index.query(query_list, n_results=args.k)
+    numpy_batch = time.perf_counter() - start
+
+    # Recall of Chroma's approximate top-k against the exact top-k
+    hits = sum(len(set(c) & set(e)) for c, e in zip(chroma_results["ids"], exact_results["ids"]))
+    total = sum(len(e) for e in exact_results["ids"])
+
+    report = {
+        "vectors": index.count(),
+        "dimensions": int(index.embeddings.shape[1]),
+        "queries": len(queries),
+        "k": args.k,
+        "numpy_index_load_seconds": load_seconds,
+        "chroma": dict(summarize(chroma_single), batch_seconds=chroma_batch),
+        "numpy": dict(summarize(numpy_single), batch_seconds=numpy_batch),
+        f"chroma_recall_at_{args.k}": hits / total if total else 1.0,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
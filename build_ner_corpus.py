@@ -0,0 +1,117 @@
+"""
+Builds the binary NER training corpus from the notebook-format JSON datasets.
+
+    python build_ner_corpus.py --data augmented_symptom_ner_data.json --output corpus
+
+Examples are deduplicated by text and their entity offsets validated against
+the spaCy tokenization (in bounds, on token boundaries, not overlapping);
+invalid examples are dropped and counted rather than trained on. The rest is
+split into a seeded train/dev pair and written as `corpus/train.spacy` and
+`corpus/dev.spacy` DocBin files, which train_ner.py and benchmark_ner.py load
+without re-parsing the JSON. `corpus/meta.json` records the counts and the
+hashes of the source files.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+from collections import Counter
+
+import spacy
+from spacy.tokens import DocBin
+
+from benchmark_ner import load_examples
+
+
+def validate(nlp, text, spans):
+    """
+    :return: (Doc with the entities set, None) or (None, reason it is invalid)
+    """
+    doc = nlp.make_doc(text)
+    ents = []
+    for start, end, label in sorted(spans):
+        if not 0 <= start < end <= len(text):
+            return None, "out of bounds"
+        if ents and start < ents[-1].end_char:
+            return None, "overlapping"
+        span = doc.char_span(start, end, label=label, alignment_mode="strict")
+        if span is None:
+            return None, "misaligned"
+        ents.append(span)
+    doc.ents = ents
+    return doc, None
+
+
+def deduplicate(examples):
+    """
+    Keeps the first annotation of every text.
+
+    :return: (unique examples, number of duplicates, number of duplicates whose
+             annotation differs from the one kept)
+    """
+    unique, duplicates, conflicts = {}, 0, 0
+    for text, spans in examples:
+        if text in unique:
+            duplicates += 1
+            conflicts += sorted(unique[text]) != sorted(spans)
+        else:
+            unique[text] = spans
+    return list(unique.items()), duplicates, conflicts
+
+
+def file_sha256(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--data", nargs="+", default=["augmented_symptom_ner_data.json"])
+    parser.add_argument("--output", default="corpus")
+    parser.add_argument("--dev-fraction", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    examples = []
+    for path in args.data:
+        examples.extend(load_examples(path))
+    unique, duplicates, conflicts = deduplicate(examples)
+
+    nlp = spacy.blank("en")
+    docs, invalid = [], Counter()
+    for text, spans in unique:
+        doc, reason = validate(nlp, text, spans)
+        if doc is None:
+            invalid[reason] += 1
+        else:
+            docs.append(doc)
+
+    random.Random(args.seed).shuffle(docs)
+    n_dev = max(1, int(len(docs) * args.dev_fraction))
+    splits = {"train": docs[n_dev:], "dev": docs[:n_dev]}
+
+    os.makedirs(args.output, exist_ok=True)
+    for name, split_docs in splits.items():
+        DocBin(attrs=["ORTH", "ENT_IOB", "ENT_TYPE"], docs=split_docs).to_disk(os.path.join(args.output, f"{name}.spacy"))
+
+    meta = {
+        "sources": {path: file_sha256(path) for path in args.data},
+        "seed": args.seed,
+        "dev_fraction": args.dev_fraction,
+        "examples": len(examples),
+        "duplicates": duplicates,
+        "conflicting_duplicates": conflicts,
+        "invalid": dict(invalid),
+        "train": len(splits["train"]),
+        "dev": len(splits["dev"]),
+        "entities": dict(Counter(ent.label_ for doc in docs for ent in doc.ents)),
+        "spacy_version": spacy.__version__,
+    }
+    with open(os.path.join(args.output, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    print(json.dumps(meta, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Read-only disease knowledge base, keyed by disease ID.
+
+The vector records only carry a disease ID (plus the dosha filter fields),
+so a search result stays small. The disease's name, dosha and full remedy
+set, grouped by category, are looked up here instead. populate_chromadb.py
+writes the store as one JSON file; serving loads it into a dict once.
+"""
+import json
+import os
+import re
+
+# Bump when the layout of the store file changes
+STORE_FORMAT_VERSION = 1
+REMEDY_CATEGORIES = ("diet", "lifestyle", "herbs", "other")
+# Word prefixes per category, checked in this order: "herbal teas" and
+# "topical treatments" are herbs, "spiced_milk" and "dietary guidelines" diet.
+# Herbal preparations (topical pastes and oils, internal formulas, common
+# herbs) count as herbs; "medical advice" does not, hence no "medic" prefix. What is left in "other" is mostly procedures such
+# as first aid, panchakarma, enemas and pressure points.
+CATEGORY_PREFIXES = (
+    ("herbs", ("herb", "formula", "tea", "supplement", "churna", "rasayana", "topical", "internal", "oil",
+               "paste", "powder", "tincture", "decoction", "capsule", "tablet", "ointment", "poultice", "salve",
+               "gargle", "mouthwash", "nasya", "drops", "compress", "medicine", "medicated", "medicinal",
+               "triphala", "ashwagandha", "brahmi", "turmeric", "neem", "guduchi", "shatavari", "licorice", "aloe",
+               "amalaki", "ginger", "tulsi")),
+    ("diet", ("diet", "food", "nutri", "fruit", "vegetable", "grain", "meal", "eat", "fast", "juice", "drink",
+              "beverage", "milk", "lassi", "soup", "porridge", "kitchari", "ghee", "honey", "spice")),
+    ("lifestyle", ("lifestyle", "yoga", "asana", "pose", "posture", "pranayama", "breath", "exercise", "stretch",
+                   "walk", "meditation", "mudra", "mind", "emotional", "stress", "relax", "rest", "routine",
+                   "daily", "habit", "practice", "sleep", "massage", "abhyanga", "bath", "avoid")),
+)
+
+
+def _match_category(text):
+    words = re.findall(r"[a-z]+", text.lower())
+    for category, prefixes in CATEGORY_PREFIXES:
+        if any(word.startswith(prefix) for word in words for prefix in prefixes):
+            return category
+    return None
+
+
+def categorize_remedy(remedy):
+    """
+    Category of one remedy text: from its "<kind>: ..." label when that
+    names one, else from the words of the remedy itself; "other" when
+    neither fits.
+    """
+    label, sep, body = remedy.partition(":")
+    return (sep and _match_category(label)) or _match_category(body if sep else remedy) or "other"
+
+
+def category_shares(diseases):
+    """:return: {category: share of all remedies in `diseases` (store entries)}"""
+    counts = {category: 0 for category in REMEDY_CATEGORIES}
+    for entry in diseases.values():
+        for category, items in entry["remedies"].items():
+            counts[category] += len(items)
+    total = sum(counts.values())
+    return {category: count / total if total else 0.0 for category, count in counts.items()}
+
+
+def group_remedies(remedies):
+    """:return: {category: [remedy, ...]} with the non-empty categories in REMEDY_CATEGORIES order"""
+    grouped = {category: [] for category in REMEDY_CATEGORIES}
+    for remedy in remedies:
+        remedy = remedy.strip()
+        items = grouped[categorize_remedy(remedy)]
+        if remedy and remedy not in items:
+            items.append(remedy)
+    return {category: items for category, items in grouped.items() if items}
+
+
+def write_store(path, diseases):
+    """
+    Writes `diseases` ({disease ID: {"disease", "dosha", "remedies"}}),
+    replacing the file atomically.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"format_version": STORE_FORMAT_VERSION, "diseases": diseases}, f, ensure_ascii=False)
+    os.replace(path + ".tmp", path)
+
+
+class DiseaseStore:
+    def __init__(self, diseases):
+        self.diseases = diseases
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            store = json.load(f)
+        if store.get("format_version") != STORE_FORMAT_VERSION:
+            raise ValueError(
+                f"{path} has format version {store.get('format_version')}, "
+                f"expected {STORE_FORMAT_VERSION}; re-run populate_chromadb.py"
+            )
+        return cls(store["diseases"])
+
+    def __len__(self):
+        return len(self.diseases)
+
+    def get(self, disease_id):
+        """:return: the disease's entry, or None for an unknown (or None) ID"""
+        return self.diseases.get(disease_id)
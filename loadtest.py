@@ -0,0 +1,283 @@
+"""
+Load test for the remedy endpoints with local stand-ins for OpenAI and MySQL.
+
+    python loadtest.py --endpoint /get_remedy --concurrency 16 --requests 2000 --output load.json
+
+The spaCy, embedder and vector index stages run for real; the OpenAI clients
+are replaced by `FakeOpenAI`, which returns a canned completion after a
+configurable delay (token by token when streaming), and the interaction log
+writes to SQLite instead of MySQL. Queries are the notebook's NER templates
+filled with symptoms from cleaned_ayurveda_data.json.
+
+The report has the throughput and the p50/p95/p99 of every pipeline stage
+(from app.stage_seconds) and of whole requests. With `--baseline` it exits
+non-zero when throughput dropped or a p95 grew by more than `--tolerance`
+compared with an earlier report, so it can gate a deploy.
+"""
+import os
+
+# Models are loaded by main() after the stand-ins are installed
+os.environ.setdefault("AYURAI_LAZY_STARTUP", "1")
+
+import argparse
+import asyncio
+import json
+import random
+import sqlite3
+import threading
+import time
+import types
+from collections import defaultdict
+
+import httpx
+import numpy as np
+
+import app
+
+# Sentence patterns from the training-data cell of AyurAI.ipynb
+TEMPLATES = [
+    "The patient has {}.",
+    "The patient is suffering from {}.",
+    "Symptoms include {}.",
+    "She has been experiencing {} lately.",
+    "{} has been reported by the user.",
+    "Signs of {} were observed.",
+    "{} occurred after consuming certain foods.",
+    "There is persistent {} in the body.",
+    "He complains of {}.",
+    "Doctors noted {} during examination.",
+    "{} seems to worsen at night.",
+    "I often experience {} during stressful days.",
+    "There are signs of {} under the skin.",
+    "He suffers from {} on a regular basis.",
+    "The patient presents with {} symptoms.",
+    "The individual is experiencing {}.",
+    "Symptoms reported include {}.",
+    "The patient complains of {}.",
+    "The patient presents with symptoms of {}.",
+    "The patient's chief complaint is {}.",
+    "Upon examination, there were clear signs of {}.",
+    "Medical history shows the patient has issues with {}.",
+    "I am experiencing {}.",
+    "I've had {} since yesterday.",
+    "My main problem is {}.",
+    "Lately I've noticed {} after meals.",
+    "I get {} frequently.",
+    "I feel {} especially in the morning.",
+    "Symptoms include {} and discomfort.",
+]
+# Queries without a symptom in them, for the no-symptoms path
+SMALL_TALK = ["Hello there.", "What can you do?", "Thanks for the help.", "Can you tell me about Ayurveda?"]
+CANNED_COMPLETION = (
+    "The closest match is the first one. It is a Pitta condition, so favour cooling foods, "
+    "drink cumin-coriander-fennel tea after meals and keep a regular sleep routine. "
+    "See a doctor if the symptoms get worse."
+)
+
+
+class FakeOpenAI:
+    """
+    Stands in for both `OpenAI` and `AsyncOpenAI`: `chat.completions.create`
+    waits `latency` seconds and returns CANNED_COMPLETION, or with
+    stream=True yields it word by word, `token_delay` seconds apart.
+    """
+
+    def __init__(self, latency=0.5, token_delay=0.01, text=CANNED_COMPLETION, asynchronous=False):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.tokens = [word + " " for word in text.split()]
+        self.text = text
+        completions = types.SimpleNamespace(create=self._create_async if asynchronous else self._create)
+        self.chat = types.SimpleNamespace(completions=completions)
+
+    def _response(self):
+        message = types.SimpleNamespace(content=self.text)
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+    @staticmethod
+    def _chunk(token):
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(delta=types.SimpleNamespace(content=token))])
+
+    def _create(self, model, messages, stream=False, **kwargs):
+        time.sleep(self.latency)
+        if not stream:
+            return self._response()
+
+        def chunks():
+            for token in self.tokens:
+                time.sleep(self.token_delay)
+                yield self._chunk(token)
+        return chunks()
+
+    async def _create_async(self, model, messages, stream=False, **kwargs):
+        await asyncio.sleep(self.latency)
+        if not stream:
+            return self._response()
+
+        async def chunks():
+            for token in self.tokens:
+                await asyncio.sleep(self.token_delay)
+                yield self._chunk(token)
+        return chunks()
+
+
+class SQLiteInteractionSink:
+    """
+    Drop-in for `app.write_interactions` as the interaction log's sink:
+    same records, written to an `interactions` table in SQLite
+    (in memory by default).
+    """
+
+    def __init__(self, path=":memory:"):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS interactions "
+            "(user_query TEXT, extracted_symptoms TEXT, system_response TEXT, score REAL, openAI_response TEXT)"
+        )
+        self._lock = threading.Lock()
+
+    def __call__(self, records):
+        with app.stage_timer("db_write"), self._lock:
+            self._db.executemany("INSERT INTO interactions VALUES (?, ?, ?, ?, ?)", records)
+            self._db.commit()
+
+    def count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM interactions").fetchone()[0]
+
+
+def generate_queries(n, data_path, seed, no_symptom_fraction, max_symptoms):
+    with open(data_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    symptoms = sorted({symptom for entry in data for symptom in entry.get("symptoms", [])})
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(n):
+        if rng.random() < no_symptom_fraction:
+            queries.append(rng.choice(SMALL_TALK))
+            continue
+        picked = rng.sample(symptoms, rng.randint(1, max_symptoms))
+        described = picked[0] if len(picked) == 1 else ", ".join(picked[:-1]) + " and " + picked[-1]
+        query = rng.choice(TEMPLATES).format(described)
+        queries.append(query[0].upper() + query[1:])
+    return queries
+
+
+async def drive(endpoint, queries, concurrency, timeout):
+    """Sends every query to the in-process app from `concurrency` concurrent clients."""
+    latencies, errors = [], []
+    pending = iter(queries)
+    transport = httpx.ASGITransport(app=app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=timeout) as client:
+        async def worker():
+            for query in pending:
+                started = time.perf_counter()
+                try:
+                    response = await client.post(endpoint, json={"query": query})
+                    response.raise_for_status()
+                except Exception as e:
+                    errors.append(repr(e))
+                    continue
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return latencies, errors, time.perf_counter() - started
+
+
+def percentiles(samples):
+    ms = np.asarray(samples) * 1000.0
+    if not len(ms):
+        return {"count": 0}
+    return {
+        "count": len(ms),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+    }
+
+
+def regressions(report, baseline, tolerance):
+    """Human-readable list of what got worse than `baseline` by more than `tolerance` (a fraction)."""
+    found = []
+    if report["throughput_rps"] < baseline["throughput_rps"] * (1 - tolerance):
+        found.append(f"throughput {report['throughput_rps']:.1f} rps < baseline {baseline['throughput_rps']:.1f} rps")
+    for stage, stats in report["stages"].items():
+        before = baseline["stages"].get(stage, {}).get("p95_ms")
+        if before and stats.get("p95_ms", 0) > before * (1 + tolerance):
+            found.append(f"{stage} p95 {stats['p95_ms']:.2f} ms > baseline {before:.2f} ms")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--endpoint", default="/get_remedy",
+                        choices=["/get_remedy", "/get_remedy_async", "/get_remedy_stream"])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup-requests", type=int, default=20, help="sent first and left out of the report")
+    parser.add_argument("--data", default="cleaned_ayurveda_data.json")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-symptoms", type=int, default=3, help="symptoms per generated query, at most")
+    parser.add_argument("--no-symptom-fraction", type=float, default=0.05)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds before the fake completion (or its first token)")
+    parser.add_argument("--llm-token-delay", type=float, default=0.01, help="seconds between streamed fake tokens")
+    parser.add_argument("--db", default=":memory:", help="SQLite file for the interaction log")
+    parser.add_argument("--no-cache", action="store_true", help="disable the response cache so every request reaches the LLM stand-in")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", help="also write the report to this JSON file")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    app._resources["openai"] = FakeOpenAI(args.llm_latency, args.llm_token_delay)
+    app._resources["async_openai"] = FakeOpenAI(args.llm_latency, args.llm_token_delay, asynchronous=True)
+    sink = SQLiteInteractionSink(args.db)
+    app.interaction_log.sink = sink
+    if args.no_cache:
+        app.response_cache.disable()
+    app.warmup()
+
+    queries = generate_queries(args.warmup_requests + args.requests, args.data, args.seed,
+                               args.no_symptom_fraction, args.max_symptoms)
+    asyncio.run(drive(args.endpoint, queries[:args.warmup_requests], args.concurrency, args.timeout))
+    # Drains the warmup's rows so they can be left out; the next request restarts the writer
+    app.interaction_log.close()
+    warmup_rows = sink.count()
+
+    stages = defaultdict(list)
+    app.stage_seconds.observers.append(lambda labels, value: stages[labels["stage"]].append(value))
+    latencies, errors, seconds = asyncio.run(
+        drive(args.endpoint, queries[args.warmup_requests:], args.concurrency, args.timeout))
+    app.interaction_log.close()
+
+    report = {
+        "endpoint": args.endpoint,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "llm_latency": args.llm_latency,
+        "response_cache": not args.no_cache,
+        "seconds": seconds,
+        "throughput_rps": len(latencies) / seconds if seconds else 0.0,
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "request": percentiles(latencies),
+        "stages": {stage: percentiles(samples) for stage, samples in sorted(stages.items())},
+        "extraction_paths": dict(app.extraction_paths),
+        "interactions_written": sink.count() - warmup_rows,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            found = regressions(report, json.load(f), args.tolerance)
+        if found:
+            raise SystemExit("Performance regression:\n" + "\n".join(found))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+ONNX Runtime backend for the all-MiniLM-L6-v2 sentence embedder.
+
+    python onnx_embedder.py export --output ./onnx_embedder
+    python onnx_embedder.py parity --model-dir ./onnx_embedder
+
+`export` converts the Hugging Face checkpoint to ONNX and quantizes its
+weights to int8 (needs torch and transformers, but only at export time).
+`OnnxEmbedder` then only needs onnxruntime and tokenizers to serve, and
+its `encode` returns the same mean-pooled, L2-normalized vectors as
+`SentenceTransformer.encode`. `parity` re-encodes the documents stored in
+chromadb_store and compares them against the PyTorch vectors stored next
+to them.
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+MODEL_FILE = "model_int8.onnx"
+# all-MiniLM-L6-v2's max_seq_length; longer inputs are truncated just like SentenceTransformer does
+MAX_LENGTH = 256
+
+
+class OnnxEmbedder:
+    """
+    Stands in for `SentenceTransformer("all-MiniLM-L6-v2")` wherever only
+    `encode` is used: the transformer runs in ONNX Runtime, followed by
+    the same mean pooling and normalization the sentence-transformers
+    pipeline appends to it.
+    """
+
+    def __init__(self, model_dir, model_file=MODEL_FILE, max_length=MAX_LENGTH, threads=None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length)
+        self.tokenizer.no_padding()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, model_file), options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.dimension = self.session.get_outputs()[0].shape[-1]
+
+    def _encode_batch(self, sentences):
+        encodings = self.tokenizer.encode_batch(sentences)
+        width = max(len(e.ids) for e in encodings)
+        input_ids = np.zeros((len(encodings), width), dtype=np.int64)
+        attention_mask = np.zeros_like(input_ids)
+        for row, encoding in enumerate(encodings):
+            input_ids[row, :len(encoding.ids)] = encoding.ids
+            attention_mask[row, :len(encoding.ids)] = 1
+        feeds = {
+            "input_ids": input_ids,
+            "attention_mask": attention_mask,
+            "token_type_ids": np.zeros_like(input_ids),
+        }
+        token_embeddings = self.session.run(None, {k: v for k, v in feeds.items() if k in self.input_names})[0]
+
+        # Mean over the real (unpadded) tokens, then unit length
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return pooled
+
+    def encode(self, sentences, batch_size=32, show_progress_bar=False, **kwargs):
+        """
+        Same call shape as `SentenceTransformer.encode`: a string gives one
+        vector, a list gives a (n, 384) float32 array. Sentences are batched
+        by length so short ones are not padded out to the longest input.
+        """
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+        sentences = list(sentences)
+
+        embeddings = np.zeros((len(sentences), self.dimension), dtype=np.float32)
+        order = np.argsort([-len(s) for s in sentences], kind="stable")
+        for start in range(0, len(order), batch_size):
+            rows = order[start:start + batch_size]
+            embeddings[rows] = self._encode_batch([sentences[r] for r in rows])
+        return embeddings[0] if single else embeddings
+
+
+def export(output_dir, model_name=MODEL_NAME, opset=17):
+    """Writes tokenizer.json, an fp32 model.onnx and its int8 quantization to `output_dir`."""
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    tokenizer.save_pretrained(output_dir)
+    model = AutoModel.from_pretrained(model_name).eval()
+
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    sample = tokenizer(["a sample sentence", "another one"], padding=True, return_tensors="pt")
+    fp32_path = os.path.join(output_dir, "model.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in names),
+            fp32_path,
+            input_names=names,
+            output_names=["last_hidden_state"],
+            dynamic_axes={name: {0: "batch", 1: "sequence"} for name in names + ["last_hidden_state"]},
+            opset_version=opset,
+            dynamo=False,
+        )
+    # Dynamic quantization: int8 weights, activations quantized per batch at run time
+    quantize_dynamic(fp32_path, os.path.join(output_dir, MODEL_FILE), weight_type=QuantType.QInt8)
+    print(f"Wrote {output_dir}/model.onnx and {output_dir}/{MODEL_FILE}")
+
+
+def check_parity(embedder, store="./chromadb_store", collection_name="ayurveda_symptoms"):
+    """
+    Re-encodes every stored document and compares it with the stored
+    PyTorch vector: per-vector cosine similarity, and whether each
+    re-encoded document still retrieves its own stored vector first.
+    """
+    import chromadb
+
+    data = chromadb.PersistentClient(path=store).get_collection(collection_name).get(
+        include=["embeddings", "documents"])
+    reference = np.asarray(data["embeddings"], dtype=np.float32)
+    reference /= np.linalg.norm(reference, axis=1, keepdims=True)
+    encoded = embedder.encode(data["documents"], batch_size=64)
+
+    cosine = np.einsum("ij,ij->i", reference, encoded)
+    top1 = np.argmax(encoded @ reference.T, axis=1) == np.arange(len(reference))
+    worst = int(np.argmin(cosine))
+    return {
+        "vectors": len(reference),
+        "min_cosine": float(cosine.min()),
+        "mean_cosine": float(cosine.mean()),
+        "max_abs_diff": float(np.abs(reference - encoded).max()),
+        "self_top1_agreement": float(top1.mean()),
+        "worst_document": data["documents"][worst],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export all-MiniLM-L6-v2 to int8 ONNX and check it against chromadb_store.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export")
+    export_parser.add_argument("--output", default="./onnx_embedder")
+    export_parser.add_argument("--model", default=MODEL_NAME)
+
+    parity_parser = commands.add_parser("parity")
+    parity_parser.add_argument("--model-dir", default="./onnx_embedder")
+    parity_parser.add_argument("--model-file", default=MODEL_FILE)
+    parity_parser.add_argument("--store", default="./chromadb_store")
+    parity_parser.add_argument("--collection", default="ayurveda_symptoms")
+    parity_parser.add_argument("--min-cosine", type=float, default=0.98,
+                               help="exit non-zero if any vector is less similar than this")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export(args.output, args.model)
+        return
+
+    __import__('pysqlite3')
+    import sys
+    sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
+    report = check_parity(OnnxEmbedder(args.model_dir, args.model_file), args.store, args.collection)
+    print(json.dumps(report, indent=2))
+    if report["min_cosine"] < args.min_cosine:
+        raise SystemExit(f"min cosine {report['min_cosine']:.4f} is below {args.min_cosine}")
+
+
+if __name__ == "__main__":
+    main()
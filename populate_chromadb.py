@@ -1,22 +1,52 @@
+import argparse
+import hashlib
 import json
-import spacy
+import os
+import re
 import nltk
 import chromadb
-import uuid
 
 from nltk.tokenize import sent_tokenize
 from sentence_transformers import SentenceTransformer
+from disease_store import category_shares, group_remedies, write_store
+from retrieval import DOSHAS
+from vector_index import write_artifact
 
-nltk.download("punkt")
+COLLECTION_NAME = "ayurveda_symptoms"
+MODEL_NAME = "all-MiniLM-L6-v2"  # Lightweight and fast
+# Memory-mappable copy of the index for the serving workers
+# (AYURAI_RETRIEVAL_BACKEND=mmap in app.py)
+INDEX_ARTIFACT = "./index_artifacts/symptom_index"
+# Disease names, doshas and remedies by disease ID (see disease_store.py);
+# the vectors only reference it
+DISEASE_STORE = "./index_artifacts/disease_store.json"
+# Per-disease content hashes and vector IDs of the last build, kept next to the store
+MANIFEST_FILE = "ingest_manifest.json"
+# Bump when the vector metadata layout changes, so --incremental rewrites every record
+METADATA_VERSION = 3
 
-# Load NLP models
-nlp = spacy.load("en_core_web_sm")
-embedder = SentenceTransformer('all-MiniLM-L6-v2')  # Lightweight and fast
+def disease_id(disease):
+    """Stable ID for a disease, used as the prefix of its vector IDs."""
+    return re.sub(r"[^a-z0-9]+", "-", disease.lower()).strip("-")
 
-# Load dataset
-with open("cleaned_ayurveda_data.json", "r", encoding="utf-8") as f:
-    data = json.load(f)
-#data = cleaned_data
+def entry_hash(entry):
+    """
+    Content hash of one dataset entry; the embedding model and metadata
+    version are part of it so changing either rebuilds everything.
+    """
+    payload = json.dumps([MODEL_NAME, METADATA_VERSION, entry], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_manifest(path, manifest):
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + ".tmp", path)
 
 # Helper: Flatten symptom or remedy fields
 def flatten_text(item):
@@ -31,65 +61,202 @@ def flatten_text(item):
         flat.append(item)
     return flat
 
+def dosha_fields(entry):
+    """
+    Filterable dosha metadata: a `dosha_<name>` boolean per dosha, from the
+    entry's primary_dosha or, when that is empty, from the doshas its
+    disease name, symptoms and remedies mention (`dosha_inferred`). A
+    disease with all flags false is not tied to any dosha.
+    """
+    text = " ".join(flatten_text(entry.get("primary_dosha", [])))
+    inferred = not text.strip()
+    if inferred:
+        text = " ".join([entry.get("disease", "")] + flatten_text(entry.get("symptoms", [])) + flatten_text(entry.get("remedies", [])))
+    text = text.lower()
+    fields = {f"dosha_{dosha}": re.search(rf"\b{dosha}\b", text) is not None for dosha in DOSHAS}
+    fields["dosha_inferred"] = inferred
+    return fields
+
+def disease_entry(entry):
+    """Disease store entry: name, dosha display string and every remedy, grouped by category."""
+    fields = dosha_fields(entry)
+    dosha = ", ".join(flatten_text(entry.get("primary_dosha", [])))
+    return {
+        "disease": entry.get("disease", "Unknown"),
+        "dosha": dosha or ", ".join(d.title() for d in DOSHAS if fields[f"dosha_{d}"]),
+        "remedies": group_remedies(flatten_text(entry.get("remedies", []))),
+    }
+
 # NLP Pipeline
-def process_ayurveda_data(data):
+def process_ayurveda_data(data, embedder, batch_size=256):
+    """
+    Splits the symptoms of every entry into sentences, then embeds the
+    symptom sentences of all diseases in one batched encode call.
+    """
     records = []
 
     for entry in data:
         disease = entry.get("disease", "Unknown")
-        dosha = entry.get("primary_dosha", [])
 
         # --- Symptoms ---
         symptoms = entry.get("symptoms", [])
         symptom_sentences = sent_tokenize(" ".join(symptoms))
-        symptom_embeddings = embedder.encode(symptom_sentences)
-
-        # --- Remedies ---
-        remedies = entry.get("remedies", {})
-        remedy_sentences = sent_tokenize(" ".join(remedies))
-        remedy_embeddings = embedder.encode(remedy_sentences)
-
 
         records.append({
+            "Disease ID": disease_id(disease),
             "Disease": disease,
-            "Dosha": dosha,
+            "Dosha Fields": dosha_fields(entry),
             "Symptoms": symptom_sentences,
-            "Symptom Embeddings": symptom_embeddings,
-            "Remedies": remedy_sentences,
-            "Remedy Embeddings": remedy_embeddings,
         })
 
+    all_sentences = [sentence for r in records for sentence in r["Symptoms"]]
+    all_embeddings = embedder.encode(all_sentences, batch_size=batch_size, show_progress_bar=True)
+
+    offset = 0
+    for r in records:
+        r["Symptom Embeddings"] = all_embeddings[offset:offset + len(r["Symptoms"])]
+        offset += len(r["Symptoms"])
+
     return records
 
-results = process_ayurveda_data(data)
-
-# Preview Output
-for r in results[:5]:
-    print("Disease:", r["Disease"])
-    print("Dosha:", r["Dosha"])
-    print("Symptoms:", r["Symptoms"][:3])  # Preview first 3
-    print("Remedies:", r["Remedies"][:3])
-
-client     = chromadb.PersistentClient(path="./chromadb_store")
-collection = client.get_or_create_collection(name="ayurveda_symptoms")
-
-for rec_idx, entry in enumerate(results):
-    disease  = entry["Disease"]
-    dosha    = ", ".join(entry["Dosha"]) # Convert list of doshas to string
-    remedies = entry["Remedies"]
-
-    # 3. For each symptom sentence + its embedding
-    for sym_idx, (sym_text, sym_emb) in enumerate(zip(entry["Symptoms"], entry["Symptom Embeddings"])):
-        # pick the matching remedy sentence (or join all if uneven lengths)
-         remedy_meta = remedies[sym_idx] if sym_idx < len(remedies) else " | ".join(remedies)
-         metadata = {
-            "disease": disease,
-            "dosha": dosha,
-            "remedy": remedy_meta
-        }
-         collection.add(
-            ids       = [f"{rec_idx}-{sym_idx}"],      # unique ID per symptom
-            embeddings= [sym_emb.tolist()],             # convert numpy array to list
-            metadatas = [metadata],
-            documents = [sym_text]
-        )
\ No newline at end of file
+def build_vectors(results):
+    """
+    Flattens processed records into parallel ids/embeddings/metadatas/documents
+    lists. The metadata is only the disease ID and the dosha filter fields;
+    everything else about the disease is in the disease store.
+    """
+    ids, embeddings, metadatas, documents = [], [], [], []
+
+    for entry in results:
+        # For each symptom sentence + its embedding
+        for sym_idx, (sym_text, sym_emb) in enumerate(zip(entry["Symptoms"], entry["Symptom Embeddings"])):
+            ids.append(f"{entry['Disease ID']}-{sym_idx}")     # unique ID per symptom
+            embeddings.append(sym_emb.tolist())    # convert numpy array to list
+            metadatas.append({
+                "disease_id": entry["Disease ID"],
+                **entry["Dosha Fields"]
+            })
+            documents.append(sym_text)
+
+    return ids, embeddings, metadatas, documents
+
+def upsert_in_chunks(collection, ids, embeddings, metadatas, documents, chunk_size):
+    """Writes vectors with a few large upserts, so re-running never collides on existing IDs."""
+    for start in range(0, len(ids), chunk_size):
+        end = start + chunk_size
+        collection.upsert(
+            ids        = ids[start:end],
+            embeddings = embeddings[start:end],
+            metadatas  = metadatas[start:end],
+            documents  = documents[start:end]
+        )
+
+def delete_stale(collection, keep_ids, chunk_size):
+    """Removes vectors left over from an earlier build, e.g. a disease that lost a symptom sentence."""
+    keep = set(keep_ids)
+    stale = [i for i in collection.get(include=[])["ids"] if i not in keep]
+    for start in range(0, len(stale), chunk_size):
+        collection.delete(ids=stale[start:start + chunk_size])
+    return stale
+
+def export_artifact(collection, prefix):
+    exported = collection.get(include=["embeddings", "documents", "metadatas"])
+    version = write_artifact(
+        prefix,
+        exported["ids"],
+        exported["embeddings"],
+        exported["documents"],
+        exported["metadatas"],
+        model_name=MODEL_NAME
+    )
+    print(f"Wrote {prefix}.{version}.npy/.json with {len(exported['ids'])} vectors (version {version})")
+
+def main():
+    parser = argparse.ArgumentParser(description="Embed cleaned_ayurveda_data.json into the ayurveda_symptoms collection.")
+    parser.add_argument("--data", default="cleaned_ayurveda_data.json")
+    parser.add_argument("--store", default="./chromadb_store")
+    parser.add_argument("--batch-size", type=int, default=256, help="sentences per embedder.encode batch")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="vectors per Chroma upsert call")
+    parser.add_argument("--artifact", default=INDEX_ARTIFACT)
+    parser.add_argument("--disease-store", default=DISEASE_STORE)
+    parser.add_argument("--incremental", action="store_true",
+                        help="only re-embed diseases whose content changed since the last build")
+    args = parser.parse_args()
+
+    nltk.download("punkt", quiet=True)
+    nltk.download("punkt_tab", quiet=True)
+
+    # Load NLP models
+    embedder = SentenceTransformer(MODEL_NAME)
+
+    # Load dataset
+    with open(args.data, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    entries = {}
+    for entry in data:
+        key = disease_id(entry.get("disease", "Unknown"))
+        if key in entries:
+            raise ValueError(f"Duplicate disease ID {key!r} in {args.data}")
+        entries[key] = entry
+    hashes = {key: entry_hash(entry) for key, entry in entries.items()}
+
+    manifest_path = os.path.join(args.store, MANIFEST_FILE)
+    manifest = load_manifest(manifest_path) if args.incremental else None
+    if args.incremental and manifest is None:
+        print(f"No {manifest_path} yet, doing a full build")
+    previous = manifest["diseases"] if manifest else {}
+
+    changed = [entry for key, entry in entries.items() if previous.get(key, {}).get("hash") != hashes[key]]
+    removed = [key for key in previous if key not in hashes]
+    print(f"{len(changed)} of {len(data)} diseases to embed, {len(removed)} removed")
+
+    results = process_ayurveda_data(changed, embedder, batch_size=args.batch_size) if changed else []
+
+    # Preview Output
+    for r in results[:5]:
+        print("Disease:", r["Disease"])
+        print("Dosha:", r["Dosha Fields"])
+        print("Symptoms:", r["Symptoms"][:3])  # Preview first 3
+
+    client     = chromadb.PersistentClient(path=args.store)
+    collection = client.get_or_create_collection(name=COLLECTION_NAME)
+    chunk_size = min(args.chunk_size, client.get_max_batch_size())
+
+    # Rewritten in full every run (it is cheap), and before the vectors, so
+    # every vector's disease ID is in the store by the time it is searchable
+    diseases = {key: disease_entry(entry) for key, entry in entries.items()}
+    write_store(args.disease_store, diseases)
+    print(f"Wrote {args.disease_store} with {len(diseases)} diseases")
+    shares = category_shares(diseases)
+    print("Remedy categories: " + ", ".join(f"{category} {share:.1%}" for category, share in shares.items()))
+
+    ids, embeddings, metadatas, documents = build_vectors(results)
+    upsert_in_chunks(collection, ids, embeddings, metadatas, documents, chunk_size)
+
+    # IDs per disease after this run: unchanged diseases keep the IDs from the manifest
+    disease_ids = {key: previous[key]["ids"] for key in hashes if key in previous}
+    for r in results:
+        disease_ids[r["Disease ID"]] = [f"{r['Disease ID']}-{i}" for i in range(len(r["Symptoms"]))]
+
+    if manifest is None:
+        stale = delete_stale(collection, [i for key_ids in disease_ids.values() for i in key_ids], chunk_size)
+    else:
+        # Vectors of removed diseases, and of changed diseases that now have fewer sentences
+        stale = [i for key in removed for i in previous[key]["ids"]]
+        for r in results:
+            old_ids = previous.get(r["Disease ID"], {}).get("ids", [])
+            stale.extend(i for i in old_ids if i not in disease_ids[r["Disease ID"]])
+        for start in range(0, len(stale), chunk_size):
+            collection.delete(ids=stale[start:start + chunk_size])
+    print(f"Upserted {len(ids)} vectors, deleted {len(stale)} stale vectors")
+
+    save_manifest(manifest_path, {
+        "model": MODEL_NAME,
+        "diseases": {key: {"hash": hashes[key], "ids": disease_ids[key]} for key in hashes}
+    })
+
+    export_artifact(collection, args.artifact)
+
+if __name__ == "__main__":
+    main()
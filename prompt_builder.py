@@ -0,0 +1,107 @@
+"""
+Builds the LLM prompt for /get_remedy within a token budget.
+
+The fixed instructions live in SYSTEM_PROMPT, so the user message carries
+only the patient's text and the retrieved context. Top matches that point at
+the same disease are merged into one entry, and every field goes in as plain
+text once, so no quotes or newlines get escaped. Entries are added best
+match first until the budget is reached; the one that does not fit is
+truncated and the rest are left out.
+
+Token counts come from tiktoken when it is installed and are estimated at
+four characters per token otherwise.
+"""
+import functools
+
+SYSTEM_PROMPT = (
+    "You are an expert Ayurveda medical assistant. You are given a patient's description "
+    "and the closest conditions from our database, best match first. Choose the most "
+    "relevant one and explain it to the patient clearly, in natural language, including "
+    "the disease name, its dosha and the remedies."
+)
+CHARS_PER_TOKEN = 4
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding(model):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text, model="gpt-5-mini"):
+    encoding = _encoding(model)
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text))
+
+
+def truncate_to_tokens(text, max_tokens, model="gpt-5-mini"):
+    if max_tokens <= 0:
+        return ""
+    encoding = _encoding(model)
+    if encoding is None:
+        limit = max_tokens * CHARS_PER_TOKEN
+        return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+    tokens = encoding.encode(text)
+    return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens - 1]).rstrip() + "…"
+
+
+def group_by_disease(matches):
+    """
+    Merges matches of the same disease, keeping the rank and similarity of
+    its best match, each distinct symptom text once and each distinct
+    remedy once under its category.
+    """
+    groups = {}
+    for m in matches:
+        group = groups.setdefault(m["disease"], {
+            "disease": m["disease"],
+            "dosha": m["dosha"],
+            "similarity": m["similarity"],
+            "symptoms": [],
+            "remedies": {},
+        })
+        if m["symptoms"] and m["symptoms"] not in group["symptoms"]:
+            group["symptoms"].append(m["symptoms"])
+        for category, remedies in m["remedies"].items():
+            items = group["remedies"].setdefault(category, [])
+            items.extend(remedy for remedy in remedies if remedy not in items)
+    return list(groups.values())
+
+
+def build_prompt(user_input, matches, budget, model="gpt-5-mini"):
+    """
+    :param budget: maximum tokens for the system and user message together
+    :return: (user message, total input tokens)
+    """
+    used = count_tokens(SYSTEM_PROMPT, model)
+    # The patient's own text may take at most half of what is left
+    patient = "Patient: " + truncate_to_tokens(user_input, (budget - used) // 2, model) + "\n\nMatches:"
+    parts = [patient]
+    used += count_tokens(patient, model)
+
+    for rank, group in enumerate(group_by_disease(matches), start=1):
+        dosha = f"dosha: {group['dosha']}; " if group["dosha"] else ""
+        remedies = "".join(
+            f"\nRemedies ({category}): {' | '.join(items)}" for category, items in group["remedies"].items())
+        entry = (
+            f"\n{rank}. {group['disease']} ({dosha}similarity {group['similarity']:.2f})\n"
+            f"Symptoms: {' | '.join(group['symptoms'])}"
+            f"{remedies}"
+        )
+        tokens = count_tokens(entry, model)
+        if used + tokens > budget:
+            entry = truncate_to_tokens(entry, budget - used, model)
+            if entry:
+                parts.append(entry)
+                used += count_tokens(entry, model)
+            break
+        parts.append(entry)
+        used += tokens
+    return "".join(parts), used
@@ -0,0 +1,166 @@
+"""
+Disease-level retrieval over the per-sentence symptom vectors.
+
+The collection holds one vector per symptom sentence, so the nearest few
+sentences often belong to the same disease. `DiseaseIndex` maps every
+stored sentence to a disease number once at startup; with it, search hits
+are collapsed to distinct diseases (`aggregate`) or, in the per-symptom
+retrieval mode, fused across the hit lists of several symptoms (`fuse`)
+with integer array operations instead of comparing metadata strings.
+
+Searches can also be limited to the diseases of the user's doshas with the
+`where` filter from `dosha_filter`.
+"""
+import re
+import threading
+
+import numpy as np
+
+# Constant of reciprocal rank fusion; 60 is the usual choice and keeps the
+# top few ranks of each list from dominating
+RRF_K = 60
+# Each is stored as a boolean `dosha_<name>` field in the vector metadata
+DOSHAS = ("vata", "pitta", "kapha")
+
+
+def parse_doshas(text):
+    """
+    Doshas named in `text`, e.g. "Pitta", "vata,kapha" or the prakriti quiz's
+    "Vata and Pitta", in DOSHAS order.
+    """
+    if not text:
+        return ()
+    named = set(re.findall(r"[a-z]+", text.lower()))
+    return tuple(dosha for dosha in DOSHAS if dosha in named)
+
+
+def dosha_filter(doshas):
+    """
+    `where` filter for a search limited to diseases of any of `doshas`, and
+    to diseases not tied to any dosha, which apply to everyone.
+
+    :return: None when there is nothing to filter out
+    """
+    doshas = [dosha for dosha in DOSHAS if dosha in doshas]
+    if not doshas or len(doshas) == len(DOSHAS):
+        return None
+    neutral = {"$and": [{f"dosha_{dosha}": False} for dosha in DOSHAS]}
+    return {"$or": [{f"dosha_{dosha}": True} for dosha in doshas] + [neutral]}
+
+
+class DiseaseIndex:
+    """
+    Disease number of every stored sentence, as an array parallel to `ids`
+    (and so to the rows of a NumpyIndex) plus a dict from id to position
+    for results that carry only ids, like Chroma's.
+
+    A Chroma collection can gain vectors after the map was built (e.g. by
+    `populate_chromadb.py --incremental`); their disease comes from the hit's
+    metadata instead, numbered on first sight.
+    """
+
+    def __init__(self, ids, metadatas):
+        self._numbers = {}
+        self._lock = threading.Lock()
+        self.diseases = []
+        self.codes = np.asarray([self._number(metadata) for metadata in metadatas], dtype=np.intp)
+        self.position = {id_: i for i, id_ in enumerate(ids)}
+
+    def _number(self, metadata):
+        # Records from before the disease store have the name instead of an ID
+        disease = metadata.get("disease_id", metadata.get("disease"))
+        number = self._numbers.get(disease)
+        if number is None:
+            with self._lock:
+                number = self._numbers.get(disease)
+                if number is None:
+                    number = self._numbers[disease] = len(self.diseases)
+                    self.diseases.append(disease)
+        return number
+
+    @classmethod
+    def from_collection(cls, collection):
+        data = collection.get(include=["metadatas"])
+        return cls(data["ids"], data["metadatas"])
+
+    def __len__(self):
+        return len(self.diseases)
+
+    def lookup(self, results, q):
+        """Disease numbers of the hits of the q-th query of a `query` result."""
+        if "rows" in results:
+            return self.codes[results["rows"][q]]
+        positions = [self.position.get(id_) for id_ in results["ids"][q]]
+        if None not in positions:
+            return self.codes[positions]
+        return np.asarray([
+            self.codes[position] if position is not None else self._number(metadata)
+            for position, metadata in zip(positions, results["metadatas"][q])
+        ], dtype=np.intp)
+
+
+def aggregate(results, q, disease_index, k=3):
+    """
+    Collapses the q-th query's hits to distinct diseases, each scored by its
+    closest hit (max similarity).
+
+    :return: positions of the top `k` diseases' closest hits, best first
+    """
+    # Hits come sorted by distance, so a disease's first hit is its closest
+    _, first = np.unique(disease_index.lookup(results, q), return_index=True)
+    return np.sort(first)[:k].tolist()
+
+
+def fuse(results, rows, disease_index, method="rrf", k=3, rrf_k=RRF_K):
+    """
+    Fuses the hit lists of `rows` (query indexes into a `query` result, one
+    per symptom) into the top `k` diseases.
+
+    "rrf" scores a disease with the sum over symptoms of 1 / (rrf_k + rank)
+    of its best hit for that symptom; "sum" sums each symptom's best
+    similarity to it (1 - distance, floored at 0).
+
+    :return: list of (row, position, score, symptom rows) per disease, best
+             first; (row, position) is the disease's closest hit, the symptom
+             rows are the indexes into `rows` whose lists it appears in
+    """
+    rows = list(rows)
+    disease = np.concatenate([disease_index.lookup(results, q) for q in rows])
+    if not len(disease):
+        return []
+    lengths = [len(results["ids"][q]) for q in rows]
+    row_of = np.repeat(np.arange(len(rows)), lengths)
+    position = np.concatenate([np.arange(n) for n in lengths])
+    similarity = 1.0 - np.concatenate([np.asarray(results["distances"][q], dtype=np.float64) for q in rows])
+
+    # (symptom, disease) matrices of the best rank / similarity of that
+    # disease's hits in that symptom's list
+    shape = (len(rows), len(disease_index))
+    best_rank = np.full(shape, np.inf)
+    np.minimum.at(best_rank, (row_of, disease), position + 1.0)
+    if method == "rrf":
+        scores = (1.0 / (rrf_k + best_rank)).sum(axis=0)
+    elif method == "sum":
+        best_similarity = np.zeros(shape)
+        np.maximum.at(best_similarity, (row_of, disease), np.maximum(similarity, 0.0))
+        scores = best_similarity.sum(axis=0)
+    else:
+        raise ValueError(f"Unknown fusion method {method!r}, expected 'rrf' or 'sum'")
+
+    # Closest hit of every disease that was hit at all
+    order = np.argsort(-similarity, kind="stable")
+    found, first = np.unique(disease[order], return_index=True)
+    closest = np.full(len(disease_index), -1)
+    closest[found] = order[first]
+
+    fused = []
+    ranked = found[np.argsort(-scores[found], kind="stable")]
+    for d in ranked[:k]:
+        hit = closest[d]
+        fused.append((
+            rows[row_of[hit]],
+            int(position[hit]),
+            float(scores[d]),
+            [int(s) for s in np.flatnonzero(np.isfinite(best_rank[:, d]))],
+        ))
+    return fused
@@ -0,0 +1,67 @@
+"""
+Standalone multi-worker API server for app.py, independent of Streamlit.
+
+    python server.py --workers 4 --bind 0.0.0.0:8000
+
+Configuration comes from the environment or a TOML file (see
+app.load_settings). The models are loaded once in the gunicorn master before
+it forks, so every worker shares the spaCy, SentenceTransformer and index
+weights copy-on-write instead of loading its own copy. Point load balancer
+health checks at /healthz and readiness checks at /readyz.
+"""
+import argparse
+import gc
+import os
+
+# Warm up explicitly in the master below rather than on import
+os.environ.setdefault("AYURAI_LAZY_STARTUP", "1")
+# HF tokenizers' thread pool does not survive fork
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+from gunicorn.app.base import BaseApplication
+
+
+def post_fork(server, worker):
+    import app
+
+    app.after_fork()
+
+
+class AyurAIServer(BaseApplication):
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        import app
+
+        app.warmup()
+        # Move everything loaded so far out of the GC's generations so the
+        # collector does not touch (and un-share) those pages in the workers
+        gc.freeze()
+        return app.app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the Ayurveda Remedy API with pre-loaded, forked workers.")
+    parser.add_argument("--bind", default=os.environ.get("AYURAI_BIND", "0.0.0.0:8000"))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("AYURAI_WORKERS", os.cpu_count() or 1)))
+    parser.add_argument("--timeout", type=int, default=120, help="seconds before a silent worker is restarted")
+    args = parser.parse_args()
+
+    AyurAIServer({
+        "bind": args.bind,
+        "workers": args.workers,
+        "worker_class": "uvicorn_worker.UvicornWorker",
+        "preload_app": True,
+        "timeout": args.timeout,
+        "post_fork": post_fork,
+    }).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+In-flight request coalescing ("single flight").
+
+While one caller (the leader) computes the value for a key, every other
+caller asking for the same key (a follower) waits for that result instead
+of starting the same work again. Nothing is kept once the leader finishes;
+remembering results is the response cache's job.
+
+`SingleFlight` is for threads, `AsyncSingleFlight` for coroutines on one
+event loop. Both offer `do(key, fn)` for plain calls, and `join`/`finish`
+for callers like a token stream whose result only exists at the end.
+
+When the leader is cancelled or interrupted (a BaseException such as
+asyncio.CancelledError, e.g. its client disconnected), its followers in
+`do` and `join` try again: one of them becomes the new leader and the rest
+follow it. Followers from plain `begin` get a `LeaderAbandoned` error
+instead, so they do not act as if they had been cancelled themselves.
+"""
+import asyncio
+import threading
+
+
+class LeaderAbandoned(RuntimeError):
+    """Raised to followers whose leader was cancelled before it finished."""
+
+
+def _follower_error(error):
+    if error is None or isinstance(error, Exception):
+        return error
+    return LeaderAbandoned(f"the leader for this key was abandoned ({type(error).__name__})")
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self, timeout=None):
+        if not self.event.wait(timeout):
+            raise TimeoutError("single-flight leader did not finish in time")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """
+    :param name: label for `counter`
+    :param counter: optional metrics.Counter with `flight` and `role` labels,
+                    incremented once per leader and per follower
+    """
+
+    def __init__(self, name, counter=None):
+        self.name = name
+        self.counter = counter
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def _count(self, leader):
+        if self.counter is not None:
+            self.counter.inc(flight=self.name, role="leader" if leader else "follower")
+
+    def begin(self, key):
+        """
+        :return: (call, leader). The leader must pass the call to `finish`;
+                 a follower gets the leader's result from `call.wait()`.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        self._count(leader)
+        return call, leader
+
+    def join(self, key):
+        """
+        `begin`, but a follower only returns once its call has finished, with
+        a result or the leader's error; when the leader was abandoned it
+        tries again, following the next leader or becoming it.
+        """
+        while True:
+            call, leader = self.begin(key)
+            if not leader:
+                call.event.wait()
+                if isinstance(call.error, LeaderAbandoned):
+                    continue
+            return call, leader
+
+    def finish(self, key, call, result=None, error=None):
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        call.result, call.error = result, _follower_error(error)
+        call.event.set()
+
+    def do(self, key, fn, *args):
+        """:return: (fn(*args) or the leader's result for `key`, whether this call was the leader)"""
+        call, leader = self.join(key)
+        if not leader:
+            return call.wait(), False
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            self.finish(key, call, error=e)
+            raise
+        self.finish(key, call, result)
+        return result, True
+
+
+class AsyncSingleFlight(SingleFlight):
+    """Same as SingleFlight, but followers await an asyncio future and hold no thread while they wait."""
+
+    def begin(self, key):
+        future = self._calls.get(key)
+        leader = future is None
+        if leader:
+            future = self._calls[key] = asyncio.get_running_loop().create_future()
+        self._count(leader)
+        return future, leader
+
+    async def join(self, key):
+        while True:
+            future, leader = self.begin(key)
+            if not leader:
+                # Unlike awaiting it, a cancelled follower leaves the shared future alone
+                await asyncio.wait([future])
+                if isinstance(future.exception(), LeaderAbandoned):
+                    continue
+            return future, leader
+
+    def finish(self, key, future, result=None, error=None):
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        if future.done():
+            return
+        error = _follower_error(error)
+        if error is not None:
+            future.set_exception(error)
+            future.exception()  # marks it retrieved, as there may be no followers
+        else:
+            future.set_result(result)
+
+    async def do(self, key, fn, *args):
+        """:return: (await fn(*args) or the leader's result for `key`, whether this call was the leader)"""
+        future, leader = await self.join(key)
+        if not leader:
+            return future.result(), False
+        try:
+            result = await fn(*args)
+        except BaseException as e:
+            self.finish(key, future, error=e)
+            raise
+        self.finish(key, future, result)
+        return result, True
@@ -0,0 +1,124 @@
+"""
+Dictionary ("gazetteer") symptom extraction over the canonical symptom
+phrases of cleaned_ayurveda_data.json.
+
+Most queries name symptoms the way the dataset does, so an exact phrase
+lookup finds them in microseconds; app.py only falls back to the spaCy NER
+model when this finds nothing. Matching is on normalized tokens (lower case,
+punctuation dropped, plural "s" folded) and tolerates one typo per word of
+five or more letters.
+"""
+import json
+import re
+from collections import Counter
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+# Splits enumerations like "headache, tremors or drowsiness" into sub-phrases
+_SUB_PHRASE = re.compile(r",|;|\(|\)|\bor\b|\band\b|\bwith\b")
+# "symptoms such as headache, tremors" -- everything after it is a list of symptoms
+_EXAMPLES = re.compile(r"\bsuch as\b|\bincluding\b|\blike\b")
+_STOPWORDS = {"a", "an", "the", "of", "in", "on", "to", "from", "due", "after", "during", "at", "by", "for", "like", "as"}
+MIN_TYPO_LENGTH = 5
+
+
+def normalize_token(token):
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    return [normalize_token(t) for t in _TOKEN.findall(text.lower())]
+
+
+def _deletes(word):
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def _within_one_edit(a, b):
+    """Levenshtein distance <= 1, counting an adjacent transposition as one edit."""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        diff = [i for i in range(len(a)) if a[i] != b[i]]
+        return len(diff) == 1 or (
+            len(diff) == 2 and diff[1] == diff[0] + 1 and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]])
+    if len(a) > len(b):
+        a, b = b, a
+    return any(b[:i] + b[i + 1:] == a for i in range(len(b)))
+
+
+class SymptomMatcher:
+    """
+    Greedy longest-match lookup of known symptom phrases in a query.
+
+    Phrases are keyed by their normalized token tuple; `match` slides over
+    the query's tokens taking the longest known phrase at each position, and
+    returns the canonical dataset spelling of every phrase it found.
+    """
+
+    def __init__(self, phrases):
+        self.phrases = {}
+        for phrase in phrases:
+            key = tuple(tokenize(phrase))
+            if key and not all(t in _STOPWORDS for t in key):
+                self.phrases.setdefault(key, phrase.strip())
+        self.max_length = max((len(k) for k in self.phrases), default=0)
+
+        # Symmetric-delete index: every vocabulary word and its one-letter
+        # deletions point back to the word, so a misspelling is corrected
+        # with a few dict lookups instead of a scan of the vocabulary
+        self.vocabulary = Counter(t for key in self.phrases for t in key)
+        self._corrections = {}
+        for word in self.vocabulary:
+            if len(word) >= MIN_TYPO_LENGTH:
+                for variant in _deletes(word) | {word}:
+                    self._corrections.setdefault(variant, set()).add(word)
+
+    @classmethod
+    def from_dataset(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        phrases = []
+        for entry in data:
+            for symptom in entry.get("symptoms", []):
+                phrases.append(symptom)
+                # Parts of an enumeration are symptoms on their own. Single words
+                # only count when listed as examples; elsewhere they tend to be
+                # modifiers ("tender, swollen, or enlarged breasts")
+                head, *examples = _EXAMPLES.split(symptom.lower(), maxsplit=1)
+                phrases.extend(p for p in _SUB_PHRASE.split(head) if len(tokenize(p)) >= 2)
+                for part in examples:
+                    phrases.extend(p for p in _SUB_PHRASE.split(part) if tokenize(p))
+        return cls(phrases)
+
+    def correct(self, token):
+        """Returns the vocabulary word within one edit of `token`, or `token` itself."""
+        if token in self.vocabulary or len(token) < MIN_TYPO_LENGTH:
+            return token
+        candidates = set(self._corrections.get(token, ()))
+        for variant in _deletes(token):
+            candidates.update(self._corrections.get(variant, ()))
+        candidates = [c for c in candidates if _within_one_edit(token, c)]
+        if not candidates:
+            return token
+        # Most common word first, alphabetical on ties so the result is stable
+        return min(candidates, key=lambda c: (-self.vocabulary[c], c))
+
+    def match(self, text):
+        tokens = [self.correct(t) for t in tokenize(text)]
+        found = []
+        i = 0
+        while i < len(tokens):
+            for length in range(min(self.max_length, len(tokens) - i), 0, -1):
+                phrase = self.phrases.get(tuple(tokens[i:i + length]))
+                if phrase is not None:
+                    if phrase not in found:
+                        found.append(phrase)
+                    i += length
+                    break
+            else:
+                i += 1
+        return found
@@ -0,0 +1,97 @@
+"""
+LLM call sharing: queries with the same cache key get one completion,
+whether they overlap in time or sit in the same batch, and a stream that
+goes away does not take its followers down with it.
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+
+import pytest
+
+os.environ["AYURAI_LAZY_STARTUP"] = "1"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+
+def matches_for(symptom):
+    return [{"id": f"{symptom}-0", "disease": symptom, "similarity": 0.5}]
+
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    calls = []
+    lock = threading.Lock()
+
+    def ask_openai(prompt):
+        with lock:
+            calls.append(prompt)
+        return f"answer to {prompt}"
+    monkeypatch.setattr(app, "ask_openai", ask_openai)
+    monkeypatch.setattr(app, "build_prompt", lambda user_input, matches: user_input)
+    monkeypatch.setattr(app, "bypass_llm", lambda matches: False)
+    monkeypatch.setattr(app, "insert_interactions", lambda *args: None)
+    monkeypatch.setattr(app, "response_cache", app.ResponseCache())
+    return calls
+
+
+def test_batch_completes_each_distinct_key_once(monkeypatch, llm_calls):
+    monkeypatch.setattr(app, "find_symptoms_batch", lambda queries: [[query] for query in queries])
+    monkeypatch.setattr(app, "search_symptoms",
+                        lambda symptoms_per_query, doshas=(): [(matches_for(s[0]), 0.5) for s in symptoms_per_query])
+    queries = [f"symptom {i}" for i in range(20)] + ["symptom 0"]
+    results = app.get_remedy_batch(app.BatchQueryRequest(queries=queries))["results"]
+    assert len(llm_calls) == 20
+    assert results[-1]["recommendation"] == results[0]["recommendation"] == "answer to symptom 0"
+
+
+def test_completion_rechecks_the_cache_as_leader(llm_calls):
+    key = app.response_cache.make_key(["cough"], matches_for("cough"))
+    app.response_cache.set(key, "cached answer")
+    # As for a request that missed just before the previous leader's `set`
+    assert app.shared_completion(key, "cough", matches_for("cough")) == "cached answer"
+    assert llm_calls == []
+
+
+def test_stream_follower_takes_over_from_disconnected_leader(monkeypatch, llm_calls):
+    async def retrieve(user_input, doshas=()):
+        return ["cough"], matches_for("cough"), 0.5
+    monkeypatch.setattr(app, "shared_retrieve_matches_async", retrieve)
+    streaming = asyncio.Event()
+
+    async def stream(prompt):
+        llm_calls.append(prompt)
+        if len(llm_calls) == 1:
+            yield "lost "
+            streaming.set()
+            await asyncio.sleep(10)
+        yield "answer"
+    monkeypatch.setattr(app, "stream_openai_async", stream)
+
+    async def events(user_input):
+        received = []
+        async for message in app._remedy_events(user_input):
+            event, data = message.splitlines()[:2]
+            received.append((event[len("event: "):], json.loads(data[len("data: "):])))
+        return received
+
+    async def scenario():
+        leader = asyncio.create_task(events("cough"))
+        await streaming.wait()
+        follower = asyncio.create_task(events("cough"))
+        for _ in range(5):
+            await asyncio.sleep(0)
+        # What Starlette does when the leader's client disconnects
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.wait_for(follower, 5)
+
+    received = asyncio.run(scenario())
+    assert [event for event, _ in received] == ["matches", "token", "done"]
+    assert received[1][1] == "answer"
+    assert received[2][1] == {"answer_source": "llm"}
+    assert len(llm_calls) == 2
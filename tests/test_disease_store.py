@@ -0,0 +1,37 @@
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import disease_store  # noqa: E402
+
+
+def _strings(item):
+    if isinstance(item, dict):
+        return [text for value in item.values() for text in _strings(value)]
+    if isinstance(item, list):
+        return [text for value in item for text in _strings(value)]
+    return [item] if isinstance(item, str) else []
+
+
+def test_categorize_remedy():
+    assert disease_store.categorize_remedy("spiced_milk: warm milk with cardamom") == "diet"
+    assert disease_store.categorize_remedy("herbal teas: ginger and tulsi") == "herbs"
+    assert disease_store.categorize_remedy("yoga: child's pose") == "lifestyle"
+    assert disease_store.categorize_remedy("composition: tulsi leaves in hot water") == "herbs"
+    assert disease_store.categorize_remedy("first aid: call a doctor") == "other"
+    assert disease_store.categorize_remedy("medical advice: consult a doctor for any chest pain") == "other"
+    assert disease_store.categorize_remedy("medicated ghee: with brahmi") == "herbs"
+
+
+def test_few_dataset_remedies_are_other():
+    with open(os.path.join(ROOT, "cleaned_ayurveda_data.json"), encoding="utf-8") as f:
+        data = json.load(f)
+    diseases = {
+        str(i): {"remedies": disease_store.group_remedies(_strings(entry.get("remedies", [])))}
+        for i, entry in enumerate(data)
+    }
+    shares = disease_store.category_shares(diseases)
+    assert shares["other"] < 0.1, shares
@@ -0,0 +1,19 @@
+import os
+import sys
+
+os.environ["AYURAI_LAZY_STARTUP"] = "1"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+
+def test_disable_bypasses_both_tiers(tmp_path):
+    path = str(tmp_path / "cache.db")
+    app.ResponseCache(path=path).set("key", "cached answer")
+    cache = app.ResponseCache(path=path)
+    cache.disable()
+    cache.reconnect()
+    assert cache.get("key") is None
+    cache.set("key", "new answer")
+    assert cache.get("key") is None
+    assert app.ResponseCache(path=path).get("key") == "cached answer"
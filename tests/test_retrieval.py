@@ -0,0 +1,17 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import retrieval  # noqa: E402
+
+
+def test_lookup_numbers_ids_added_after_the_index_was_built():
+    index = retrieval.DiseaseIndex(["cold-0", "acne-0"], [{"disease_id": "cold"}, {"disease_id": "acne"}])
+    results = {
+        "ids": [["flu-0", "cold-0", "flu-1", "acne-0"]],
+        "metadatas": [[{"disease_id": "flu"}, {"disease_id": "cold"}, {"disease_id": "flu"}, {"disease_id": "acne"}]],
+        "distances": [[0.1, 0.2, 0.3, 0.4]],
+    }
+    assert index.lookup(results, 0).tolist() == [2, 0, 2, 1]
+    assert retrieval.aggregate(results, 0, index) == [0, 1, 3]
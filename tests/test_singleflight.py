@@ -0,0 +1,62 @@
+import asyncio
+import os
+import sys
+import threading
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from singleflight import AsyncSingleFlight, LeaderAbandoned, SingleFlight  # noqa: E402
+
+
+def test_async_follower_takes_over_from_cancelled_leader():
+    async def scenario():
+        flights = AsyncSingleFlight("test")
+        started = asyncio.Event()
+        calls = []
+
+        async def work():
+            calls.append(None)
+            if len(calls) == 1:
+                started.set()
+                await asyncio.sleep(10)
+            return "answer"
+
+        leader = asyncio.create_task(flights.do("key", work))
+        await started.wait()
+        follower = asyncio.create_task(flights.do("key", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert await follower == ("answer", True)
+        assert len(calls) == 2
+
+    asyncio.run(scenario())
+
+
+def test_thread_follower_of_interrupted_leader_gets_an_ordinary_error():
+    flights = SingleFlight("test")
+    call, leader = flights.begin("key")
+    follower_call, follower_leader = flights.begin("key")
+    assert leader and not follower_leader
+    flights.finish("key", call, error=KeyboardInterrupt())
+    with pytest.raises(LeaderAbandoned):
+        follower_call.wait(timeout=1)
+
+
+def test_thread_follower_takes_over_from_interrupted_leader():
+    followed = threading.Event()
+    counter = types.SimpleNamespace(inc=lambda flight, role: role == "follower" and followed.set())
+    flights = SingleFlight("test", counter)
+    call, _ = flights.begin("key")
+    joined = []
+    follower = threading.Thread(target=lambda: joined.append(flights.join("key")))
+    follower.start()
+    assert followed.wait(timeout=5)
+    flights.finish("key", call, error=KeyboardInterrupt())
+    follower.join(timeout=5)
+    new_call, leader = joined[0]
+    assert leader and new_call is not call
@@ -0,0 +1,91 @@
+"""
+Smoke test for app startup with the models and clients stubbed out: every
+loader must run to completion, including loaders that load other resources
+(the search index needs the Chroma client, the disease index the search index).
+"""
+import os
+import sys
+import threading
+import types
+
+import numpy as np
+import pytest
+
+os.environ["AYURAI_LAZY_STARTUP"] = "1"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+IDS = ["cold-0", "cold-1", "acne-0"]
+METADATAS = [
+    {"disease_id": "cold", "dosha_vata": False, "dosha_pitta": False, "dosha_kapha": True, "dosha_inferred": True},
+    {"disease_id": "cold", "dosha_vata": False, "dosha_pitta": False, "dosha_kapha": True, "dosha_inferred": True},
+    {"disease_id": "acne", "dosha_vata": False, "dosha_pitta": True, "dosha_kapha": False, "dosha_inferred": True},
+]
+
+
+class FakeCollection:
+    def get(self, include=()):
+        return {
+            "ids": IDS,
+            "embeddings": np.eye(3, 4, dtype=np.float32),
+            "documents": ["runny nose", "sneezing", "pimples"],
+            "metadatas": METADATAS,
+        }
+
+
+def fake_chroma_client():
+    return types.SimpleNamespace(get_or_create_collection=lambda name: FakeCollection())
+
+
+@pytest.fixture
+def stubbed(monkeypatch):
+    monkeypatch.setattr(app, "load_symptoms_model", lambda: object())
+    monkeypatch.setattr(app, "load_symptom_matcher", lambda: object())
+    monkeypatch.setattr(app, "load_embedder_model", lambda: object())
+    monkeypatch.setattr(app, "load_chroma_client", fake_chroma_client)
+    monkeypatch.setattr(app, "load_openai_client", lambda: object())
+    monkeypatch.setattr(app, "load_async_openai_client", lambda: object())
+    monkeypatch.setattr(app, "DISEASE_STORE", os.devnull + ".missing")
+    monkeypatch.setattr(app, "_resources", {})
+    monkeypatch.setattr(app, "_ready", threading.Event())
+    return app
+
+
+@pytest.mark.parametrize("backend", ["chroma", "numpy"])
+def test_warmup_completes(stubbed, monkeypatch, backend):
+    monkeypatch.setattr(app, "RETRIEVAL_BACKEND", backend)
+    worker = threading.Thread(target=app.warmup, daemon=True)
+    worker.start()
+    worker.join(timeout=30)
+    assert not worker.is_alive(), "warmup() did not finish; a loader is blocked"
+    assert app._ready.is_set()
+    assert len(app.get_disease_index()) == 2
+
+
+def test_failed_warmup_is_reported(stubbed, monkeypatch, caplog):
+    from fastapi.testclient import TestClient
+
+    def no_key():
+        raise RuntimeError("no OpenAI key configured")
+    monkeypatch.setattr(app, "load_openai_client", no_key)
+    monkeypatch.setattr(app, "_warmup_error", None)
+    with TestClient(app.app) as client:
+        for _ in range(300):
+            if app._warmup_error is not None:
+                break
+            threading.Event().wait(0.01)
+        response = client.get("/readyz")
+    assert response.status_code == 503
+    assert "no OpenAI key configured" in response.json()["error"]
+    assert "Warmup failed" in caplog.text
+
+
+def test_after_fork_reopens_chroma(monkeypatch, tmp_path):
+    chromadb = pytest.importorskip("chromadb")
+    monkeypatch.setattr(app, "RETRIEVAL_BACKEND", "numpy")
+    monkeypatch.setattr(app, "_resources", {"chroma": chromadb.PersistentClient(path=str(tmp_path))})
+    inherited = app._resources["chroma"]._system
+    app.after_fork()
+    assert "chroma" not in app._resources
+    assert chromadb.PersistentClient(path=str(tmp_path))._system is not inherited
@@ -0,0 +1,42 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vector_index import NumpyIndex, write_artifact  # noqa: E402
+
+
+def build(prefix, seed):
+    embeddings = np.random.default_rng(seed).random((3, 4), dtype=np.float32)
+    ids = [f"{seed}-{i}" for i in range(3)]
+    return write_artifact(prefix, ids, embeddings, ["a", "b", "c"], [{}] * 3, "test"), ids
+
+
+def test_rebuild_switches_vectors_and_ids_together(tmp_path):
+    prefix = str(tmp_path / "symptom_index")
+    first, _ = build(prefix, 1)
+    second, ids = build(prefix, 2)
+    third, ids = build(prefix, 3)
+
+    index = NumpyIndex.from_artifact(prefix)
+    assert index.version == third and index.ids == ids
+    # The current and the previous version's matrix are kept, older ones removed
+    assert sorted(p.name for p in tmp_path.glob("*.npy")) == sorted(
+        f"symptom_index.{v}.npy" for v in (second, third))
+
+
+def test_sidecar_must_name_its_own_version(tmp_path):
+    prefix = str(tmp_path / "symptom_index")
+    first, _ = build(prefix, 1)
+    build(prefix, 2)
+    with open(prefix + ".json", "r", encoding="utf-8") as f:
+        sidecar = json.load(f)
+    sidecar["vectors"] = f"symptom_index.{first}.npy"
+    with open(prefix + ".json", "w", encoding="utf-8") as f:
+        json.dump(sidecar, f)
+    with pytest.raises(ValueError):
+        NumpyIndex.from_artifact(prefix)
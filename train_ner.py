@@ -0,0 +1,158 @@
+"""
+Trains the symptom NER model, replacing the training cell of AyurAI.ipynb.
+
+    python build_ner_corpus.py
+    python train_ner.py --output symptom_ner_model
+
+Trains on the deduplicated train/dev DocBin files of build_ner_corpus.py;
+`--data` trains on JSON datasets directly instead, with a seeded split made
+here. Examples are built once and the model is updated on whole minibatches
+(the notebook called `nlp.update` once per example). The held-out dev split
+is scored after every epoch; training stops once the dev F1 has not
+improved for `--patience` epochs and the best epoch is what gets saved.
+`<output>/training_metrics.json` records the per-epoch losses, dev scores
+and timings, and a benchmark_ner.py run of the saved model on the dev split.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import time
+
+import spacy
+from spacy.training import Example
+from spacy.util import compounding, fix_random_seed, minibatch
+
+from benchmark_ner import benchmark_dataset, load_docs, load_examples, score_entities
+
+
+def split_examples(examples, dev_fraction, seed):
+    """Seeded train/dev split. Duplicate texts are dropped first so none ends up on both sides."""
+    unique = list({text: (text, spans) for text, spans in examples}.values())
+    random.Random(seed).shuffle(unique)
+    n_dev = max(1, int(len(unique) * dev_fraction))
+    return unique[n_dev:], unique[:n_dev]
+
+
+def evaluate(nlp, examples, batch_size):
+    predicted = [
+        [(ent.start_char, ent.end_char, ent.label_) for ent in doc.ents]
+        for doc in nlp.pipe([text for text, _ in examples], batch_size=batch_size)
+    ]
+    return score_entities([spans for _, spans in examples], predicted)
+
+
+def save_model(nlp, output):
+    """Writes the pipeline next to `output` first, then swaps it in, so a crash never leaves half a model behind."""
+    staging = output.rstrip("/\\") + ".tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    nlp.to_disk(staging)
+    if os.path.exists(output):
+        shutil.rmtree(output)
+    os.replace(staging, output)
+
+
+def load_training_data(args, nlp):
+    """:return: (training Examples, dev (text, spans) pairs)"""
+    if args.data:
+        examples = []
+        for path in args.data:
+            examples.extend(load_examples(path))
+        train_data, dev_data = split_examples(examples, args.dev_fraction, args.seed)
+        return [Example.from_dict(nlp.make_doc(text), {"entities": spans}) for text, spans in train_data], dev_data
+    for path in (args.train, args.dev):
+        if not os.path.exists(path):
+            raise SystemExit(f"{path} not found; run build_ner_corpus.py first or pass --data")
+    train_examples = [Example(nlp.make_doc(doc.text), doc) for doc in load_docs(args.train, nlp.vocab)]
+    return train_examples, load_examples(args.dev)
+
+
+def train(args):
+    fix_random_seed(args.seed)
+    nlp = spacy.blank("en")
+
+    start = time.perf_counter()
+    train_examples, dev_data = load_training_data(args, nlp)
+    load_seconds = time.perf_counter() - start
+    print(f"{len(train_examples)} training and {len(dev_data)} dev examples")
+
+    ner = nlp.add_pipe("ner")
+    for label in sorted({ent.label_ for example in train_examples for ent in example.reference.ents}):
+        ner.add_label(label)
+    optimizer = nlp.initialize(lambda: train_examples)
+
+    shuffle = random.Random(args.seed)
+    epochs, best, best_bytes, stale = [], None, None, 0
+    for epoch in range(1, args.max_epochs + 1):
+        started = time.perf_counter()
+        shuffle.shuffle(train_examples)
+        losses = {}
+        batches = minibatch(train_examples, size=compounding(args.batch_start, args.batch_stop, args.batch_compound))
+        for batch in batches:
+            nlp.update(batch, drop=args.dropout, sgd=optimizer, losses=losses)
+        train_seconds = time.perf_counter() - started
+        scores = evaluate(nlp, dev_data, args.eval_batch_size)
+        epochs.append({
+            "epoch": epoch,
+            "loss": float(losses.get("ner", 0.0)),
+            "train_seconds": train_seconds,
+            "dev_precision": scores["precision"],
+            "dev_recall": scores["recall"],
+            "dev_f1": scores["f1"],
+        })
+        print(f"Epoch {epoch}: loss {epochs[-1]['loss']:.2f}, dev F1 {scores['f1']:.4f} ({train_seconds:.1f}s)")
+
+        if best is None or scores["f1"] > best["dev_f1"] + args.min_delta:
+            best, best_bytes, stale = epochs[-1], nlp.to_bytes(), 0
+        else:
+            stale += 1
+            if stale >= args.patience:
+                print(f"No dev F1 improvement for {args.patience} epochs, stopping")
+                break
+
+    nlp.from_bytes(best_bytes)
+    nlp.meta["name"] = "symptom_ner"
+    nlp.meta["performance"] = {"ents_p": best["dev_precision"], "ents_r": best["dev_recall"], "ents_f": best["dev_f1"]}
+    save_model(nlp, args.output)
+
+    metrics = {
+        "config": vars(args),
+        "train_examples": len(train_examples),
+        "dev_examples": len(dev_data),
+        "load_seconds": load_seconds,
+        "total_seconds": time.perf_counter() - start,
+        "best_epoch": best["epoch"],
+        "epochs": epochs,
+        "dev_benchmark": benchmark_dataset(spacy.load(args.output), dev_data, argparse.Namespace(
+            batch_size=args.eval_batch_size, n_process=1, latency_docs=args.latency_docs)),
+    }
+    with open(os.path.join(args.output, "training_metrics.json"), "w", encoding="utf-8") as f:
+        json.dump(metrics, f, indent=2)
+    print(f"Saved epoch {best['epoch']} (dev F1 {best['dev_f1']:.4f}) to {args.output}")
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--train", default="corpus/train.spacy")
+    parser.add_argument("--dev", default="corpus/dev.spacy")
+    parser.add_argument("--data", nargs="+", help="JSON datasets to split here instead of --train/--dev")
+    parser.add_argument("--output", default="symptom_ner_model")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dev-fraction", type=float, default=0.1, help="dev share of --data")
+    parser.add_argument("--max-epochs", type=int, default=30)
+    parser.add_argument("--patience", type=int, default=3, help="epochs without dev F1 improvement before stopping")
+    parser.add_argument("--min-delta", type=float, default=0.0, help="smallest dev F1 gain that counts as an improvement")
+    parser.add_argument("--dropout", type=float, default=0.3)
+    # Minibatch sizes grow from --batch-start to --batch-stop, as in the notebook
+    parser.add_argument("--batch-start", type=float, default=4.0)
+    parser.add_argument("--batch-stop", type=float, default=32.0)
+    parser.add_argument("--batch-compound", type=float, default=1.001)
+    parser.add_argument("--eval-batch-size", type=int, default=64)
+    parser.add_argument("--latency-docs", type=int, default=200)
+    train(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
 import streamlit as st
 import requests
 import re
+import json
 
 #API_URL = "http://localhost:8000/get_remedy"
 API_URL = "http://127.0.0.1:8000/get_remedy"
+STREAM_URL = "http://127.0.0.1:8000/get_remedy_stream"
 
 
 st.set_page_config(page_title="Ayurveda Remedy Chatbot", layout="centered")
@@ -55,9 +57,14 @@ def format_llm_response(response_text: str):
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
-def stream_generator():
-    for word in data["recommendation"].split():
-        yield word + " "
+def stream_generator(res):
+    """Yields the recommendation tokens from the /get_remedy_stream SSE response."""
+    event = None
+    for line in res.iter_lines(decode_unicode=True):
+        if line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:") and event == "token":
+            yield json.loads(line[len("data:"):])
 
 # Display chat history
 for msg in st.session_state.messages:
@@ -74,29 +81,12 @@ if st.button("Get Remedy"):
         st.session_state.messages.append({"role": "user", "content": user_input})
 
         with st.spinner("Finding remedy..."):
-            res = requests.post(API_URL, json={"query": user_input})
+            res = requests.post(STREAM_URL, json={"query": user_input}, stream=True)
 
         if res.status_code == 200:
-            data = res.json()
-            if "recommendation" in data:
-                formatted_output = format_llm_response(data["recommendation"])
-                st.write_stream(stream_generator())                
-                #bot_reply = formatted_output            
-                
-            elif "matches" in data:
-                matches = data["matches"]
-                if matches:
-                    bot_reply = "Here are the top matches for your symptoms:\n\n"
-                    for match in matches:
-                        bot_reply += f"- **Disease:** {match['disease']}\n"
-                        bot_reply += f"  **Dosha:** {match['dosha']}\n"
-                        bot_reply += f"  **Remedies:** {match['remedy']}\n\n"
-                else:
-                    bot_reply = "No matching remedies found for your symptoms."
-            else:
-                bot_reply = "No remedy found for given symptoms."
-
-            st.session_state.messages.append({"role": "bot", "content": data["recommendation"]})
+            # Render completion tokens as the server forwards them
+            recommendation = st.write_stream(stream_generator(res))
+            st.session_state.messages.append({"role": "bot", "content": recommendation})
         else:
             st.error("Error fetching remedy")
 
@@ -0,0 +1,221 @@
+"""
+In-process exact-search index over the `ayurveda_symptoms` vectors.
+
+The collection is small (one vector per symptom sentence of ~111 diseases),
+so a brute-force matrix product over every vector is both faster than a
+round trip through Chroma's SQLite metadata store and HNSW files, and exact
+rather than approximate.
+"""
+import glob
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+# Bump when the layout of the .npy/.json pair changes
+ARTIFACT_FORMAT_VERSION = 2
+
+
+def matches_where(metadata, where):
+    """
+    Evaluates the subset of Chroma's `where` filters used here: `$and`,
+    `$or`, and `{field: value}` or `{field: {"$eq": value}}` per field.
+    """
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, sub) for sub in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, sub) for sub in condition):
+                return False
+        else:
+            if isinstance(condition, dict):
+                if set(condition) != {"$eq"}:
+                    raise ValueError(f"Unsupported where operator in {condition!r}")
+                condition = condition["$eq"]
+            # A field missing from older metadata only matches False
+            if metadata.get(key, False if isinstance(condition, bool) else None) != condition:
+                return False
+    return True
+
+
+class NumpyIndex:
+    """
+    All vectors in one contiguous float32 matrix, with ids, documents and
+    metadatas held in lists parallel to its rows.
+
+    `query` takes the same arguments as `collection.query` and returns the
+    same result layout, so it can be swapped in for the Chroma collection.
+    Distances are squared L2, matching Chroma's default "l2" space.
+
+    A `where` filter is answered from a partition: a contiguous copy of the
+    matching rows, built once per distinct filter (see `partition`), so a
+    filtered search only scans those rows.
+    """
+
+    def __init__(self, ids, embeddings, documents, metadatas):
+        self.ids = list(ids)
+        self.documents = list(documents)
+        self.metadatas = list(metadatas)
+        self.embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        self._sq_norms = np.einsum("ij,ij->i", self.embeddings, self.embeddings)
+        self._partitions = {}
+        self._partitions_lock = threading.Lock()
+
+    @classmethod
+    def from_collection(cls, collection):
+        data = collection.get(include=["embeddings", "documents", "metadatas"])
+        return cls(data["ids"], data["embeddings"], data["documents"], data["metadatas"])
+
+    @classmethod
+    def from_artifact(cls, prefix):
+        """
+        Opens an artifact written by `write_artifact`. The matrix is memory
+        mapped read-only, so every worker process on the host shares one
+        page-cache copy instead of loading its own.
+        """
+        with open(prefix + ".json", "r", encoding="utf-8") as f:
+            sidecar = json.load(f)
+        if sidecar.get("format_version") != ARTIFACT_FORMAT_VERSION:
+            raise ValueError(
+                f"{prefix}.json has format version {sidecar.get('format_version')}, "
+                f"expected {ARTIFACT_FORMAT_VERSION}; re-run populate_chromadb.py"
+            )
+        # The sidecar names the matrix file of its own version
+        vectors = os.path.join(os.path.dirname(prefix), sidecar["vectors"])
+        if sidecar["vectors"] != vectors_file(prefix, sidecar["version"]):
+            raise ValueError(f"{prefix}.json points at {sidecar['vectors']}, not the file of version {sidecar['version']}")
+        embeddings = np.load(vectors, mmap_mode="r")
+        if embeddings.shape != (sidecar["count"], sidecar["dim"]) or embeddings.dtype != np.float32:
+            raise ValueError(f"{vectors} does not match its sidecar (version {sidecar['version']})")
+        index = cls(sidecar["ids"], embeddings, sidecar["documents"], sidecar["metadatas"])
+        index.version = sidecar["version"]
+        return index
+
+    def count(self):
+        return len(self.ids)
+
+    def partition(self, where):
+        """
+        :return: (rows, embeddings, squared norms) of the rows matching
+                 `where`, cached per filter
+        """
+        key = json.dumps(where, sort_keys=True)
+        part = self._partitions.get(key)
+        if part is None:
+            with self._partitions_lock:
+                part = self._partitions.get(key)
+                if part is None:
+                    rows = np.asarray([r for r, m in enumerate(self.metadatas) if matches_where(m, where)], dtype=np.intp)
+                    part = self._partitions[key] = (rows, np.ascontiguousarray(self.embeddings[rows]), self._sq_norms[rows])
+        return part
+
+    def search(self, query_embeddings, n_results=10, where=None):
+        """
+        Exact top-k over all rows, or over the rows matching `where`.
+
+        :return: (rows, distances), both of shape (n_queries, k) and sorted
+                 by ascending distance
+        """
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[None, :]
+        if where is None:
+            part_rows, embeddings, sq_norms = None, self.embeddings, self._sq_norms
+        else:
+            part_rows, embeddings, sq_norms = self.partition(where)
+        k = min(n_results, len(embeddings))
+        if k == 0:
+            return np.empty((len(queries), 0), dtype=np.intp), np.empty((len(queries), 0), dtype=np.float32)
+
+        # ||q - x||^2 = ||q||^2 + ||x||^2 - 2 q.x, one matrix product for the whole batch
+        distances = queries @ embeddings.T
+        distances *= -2.0
+        distances += sq_norms[None, :]
+        distances += np.einsum("ij,ij->i", queries, queries)[:, None]
+        np.maximum(distances, 0.0, out=distances)
+
+        if k < distances.shape[1]:
+            rows = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        else:
+            rows = np.broadcast_to(np.arange(distances.shape[1]), distances.shape)
+        top = np.take_along_axis(distances, rows, axis=1)
+        order = np.argsort(top, axis=1, kind="stable")
+        rows = np.take_along_axis(rows, order, axis=1)
+        if part_rows is not None:
+            rows = part_rows[rows]
+        return rows, np.take_along_axis(top, order, axis=1)
+
+    def query(self, query_embeddings, n_results=10, where=None):
+        """`collection.query`, plus the hits' matrix `rows` (for retrieval.DiseaseIndex)."""
+        rows, distances = self.search(query_embeddings, n_results, where)
+        return {
+            "rows": rows,
+            "ids": [[self.ids[r] for r in q] for q in rows],
+            "documents": [[self.documents[r] for r in q] for q in rows],
+            "metadatas": [[self.metadatas[r] for r in q] for q in rows],
+            "distances": distances.tolist(),
+        }
+
+
+def vectors_file(prefix, version):
+    """Name (without directory) of the matrix file of one artifact version."""
+    return f"{os.path.basename(prefix)}.{version}.npy"
+
+
+def write_artifact(prefix, ids, embeddings, documents, metadatas, model_name):
+    """
+    Writes the vectors to `<prefix>.<version>.npy` and the ids, documents and
+    metadatas to a `<prefix>.json` sidecar that names that file. A new
+    version's matrix gets a new file, so replacing the sidecar is the one
+    atomic switch and a serving process never pairs vectors and ids of
+    different builds. The previous version's matrix is kept for processes
+    that read the old sidecar just before the switch; older ones are removed.
+
+    :return: the artifact version, a hash of the vectors and ids
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    ids = list(ids)
+    digest = hashlib.sha256(embeddings.tobytes())
+    digest.update(json.dumps(ids).encode("utf-8"))
+    version = digest.hexdigest()[:16]
+
+    directory = os.path.dirname(prefix)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    vectors = vectors_file(prefix, version)
+    with open(os.path.join(directory, vectors + ".tmp"), "wb") as f:
+        np.save(f, embeddings)
+    os.replace(os.path.join(directory, vectors + ".tmp"), os.path.join(directory, vectors))
+
+    previous = None
+    if os.path.exists(prefix + ".json"):
+        try:
+            with open(prefix + ".json", "r", encoding="utf-8") as f:
+                previous = json.load(f).get("vectors")
+        except ValueError:
+            pass
+
+    sidecar = {
+        "format_version": ARTIFACT_FORMAT_VERSION,
+        "version": version,
+        "vectors": vectors,
+        "model": model_name,
+        "count": int(embeddings.shape[0]),
+        "dim": int(embeddings.shape[1]),
+        "ids": ids,
+        "documents": list(documents),
+        "metadatas": list(metadatas),
+    }
+    with open(prefix + ".json.tmp", "w", encoding="utf-8") as f:
+        json.dump(sidecar, f, ensure_ascii=False)
+
+    os.replace(prefix + ".json.tmp", prefix + ".json")
+
+    for path in glob.glob(glob.escape(prefix) + ".*.npy"):
+        if os.path.basename(path) not in (vectors, previous):
+            os.remove(path)
+    return version